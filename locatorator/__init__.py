@@ -1,12 +1,87 @@
-import typing, enum, re, copy, dataclasses
+import typing, enum, re, io, os, sys, copy, json, zlib, array, bisect, hashlib, itertools, dataclasses, pathlib, functools, concurrent.futures
 from timecode import Timecode, TimecodeRange
+from locatorator.timecodes import DEFAULT_RATE, TimecodeParseError, detect_rate, format_timecode, timecode_rate, timecode_drop_frame, timecode_to_string, parse_timecode, parse_timecodes, to_frame_number
 
-PAT_VFX_MARKER = re.compile(r"^\s*[a-z]{2,4}[0-9]{3,4}(?:[^\sa-z0-9][a-z0-9]+\b)?", re.IGNORECASE)
+ShotIdPatterns:dict[str, str] = {
+	"default": r"[a-z]{2,4}[0-9]{3,4}(?:[^\sa-z0-9][a-z0-9]+\b)?",
+	# Support: LF1020
+	#          LF1020 and some extraneous stuff
+	#          LF1020_pt1
+	#          LF1020-pt2 and some extraneous stuff
+}
+"""Registry of named shot ID patterns, matched case-insensitively at the start of a marker comment"""
+
+SHOT_ID_GROUP = "shot_id"
+"""Group holding the whole shot ID in a combined pattern (patterns may have groups of their own)"""
+
+def register_shot_id_pattern(name:str, pattern:str) -> None:
+	"""Add or replace a named shot ID pattern in the registry"""
+
+	if not name.isidentifier():
+		raise ValueError(f"Invalid shot ID pattern name \"{name}\": Use letters, numbers and underscores only")
+
+	if name == SHOT_ID_GROUP:
+		raise ValueError(f"Invalid shot ID pattern name \"{name}\": This name is reserved")
+
+	try:
+		compiled = re.compile(pattern)
+	except re.error as e:
+		raise ValueError(f"Invalid shot ID pattern \"{name}\": {e}") from e
+	
+	if SHOT_ID_GROUP in compiled.groupindex:
+		raise ValueError(f"Invalid shot ID pattern \"{name}\": The group name \"{SHOT_ID_GROUP}\" is reserved")
+
+	ShotIdPatterns[name] = pattern
+
+def load_shot_id_patterns(file_input:typing.TextIO) -> typing.List[str]:
+	"""Register shot ID patterns from a file of `name	pattern` lines, returning the names loaded"""
+
+	names = []
+
+	for idx, line in enumerate(map(lambda l: l.rstrip('\n'), file_input)):
+
+		if not line.strip() or line.lstrip().startswith("#"):
+			continue
+
+		name, _, pattern = line.partition('\t')
+		try:
+			register_shot_id_pattern(name.strip(), pattern.strip())
+		except ValueError as e:
+			raise ValueError(f"Cannot load shot ID pattern on line {idx+1}: {e}") from e
+		names.append(name.strip())
+
+	return names
+
+@functools.lru_cache(maxsize=32)
+def _compile_shot_id_patterns(patterns:typing.Tuple[typing.Tuple[str,str],...]) -> re.Pattern:
+	"""Combine named patterns into one alternation, so all are matched in a single pass"""
+
+	try:
+		return re.compile(rf"^\s*(?P<{SHOT_ID_GROUP}>" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns) + ")", re.IGNORECASE)
+	except re.error as e:
+		raise ValueError(f"Cannot combine shot ID patterns: {e}") from e
+
+def get_shot_id_pattern(names:typing.Optional[typing.Iterable[str]]=None) -> re.Pattern:
+	"""Get a single compiled regex matching the named shot ID patterns (default: all registered patterns)"""
+
+	names = list(names) if names else list(ShotIdPatterns)
+
+	if unknown := [name for name in names if name not in ShotIdPatterns]:
+		raise ValueError(f"Unknown shot ID pattern: {', '.join(unknown)}")
+
+	return _compile_shot_id_patterns(tuple((name, ShotIdPatterns[name]) for name in names))
+
+PAT_VFX_MARKER = get_shot_id_pattern(["default"])
 """Pattern for matching a VFX ID marker comment"""
-# Support: LF1020
-#          LF1020 and some extraneous stuff
-#          LF1020_pt1
-#          LF1020-pt2 and some extraneous stuff
+
+MAPPED_READER_THRESHOLD = 8 * 1024 * 1024
+"""Marker lists at least this many bytes are read with the memory-mapped reader"""
+
+LEGACY_ENCODING = "mac_roman" if sys.platform == "darwin" else "cp1252"
+"""Encoding Avid uses for non-UTF-8 marker lists on this platform"""
+
+BOM_UTF8 = b"\xef\xbb\xbf"
+BOMS_UTF16 = (b"\xff\xfe", b"\xfe\xff")
 
 class MarkerListFormats(enum.Enum):
 	"""Marker list formats supported"""
@@ -82,20 +157,65 @@ class ChangeTypes(enum.IntEnum):
 	DELETED   = enum.auto()
 	"""Marker has been deleted from the new version"""
 
+	RENAMED   = enum.auto()
+	"""Marker position has not changed, but it was paired up with an old marker under a different shot ID"""
+
+
+class MarkerListLoadError(ValueError):
+	"""A marker list could not be loaded"""
+
+	def __init__(self, side:str, error:Exception):
+		super().__init__(f"{side} marker list: {error}")
+		self.side = side
+		"""Which marker list failed to load (Ex: "Old" or "New")"""
+		self.error = error
+		"""The underlying error"""
+
+class MarkerParseError(ValueError):
+	"""A line in a marker list could not be parsed"""
+
+	def __init__(self, line_number:int, error:typing.Union[str,Exception]):
+		super().__init__(f"Cannot parse marker on line {line_number}: {error}")
+		self.line_number = line_number
+		"""The line that could not be parsed"""
+		self.error = str(error)
+		"""Why the line could not be parsed"""
+
+	def __reduce__(self):
+		return (self.__class__, (self.line_number, self.error))
+
+class TimecodeWindowError(ValueError):
+	"""A timecode window to compare within doesn't fit the marker lists"""
 
 class Marker:
 	"""An Avid Marker/Locator"""
 
 	_pat_bad_chars = re.compile("[\n\t]")
 
-	def __init__(self, *, name:str, tc_start:typing.Union[str,Timecode], track:str, color:typing.Union[str,MarkerColors], comment:str, duration:int, user:str=""):
+	def __init__(self, *, name:str, tc_start:typing.Union[str,int,Timecode], track:str, color:typing.Union[str,MarkerColors], comment:str, duration:typing.Union[int,str,Timecode], user:str="", rate:int=DEFAULT_RATE, drop_frame:bool=False):
 
 		self._name    = self._sanitize_string(name)
-		self._tc      = TimecodeRange(start=Timecode(tc_start), duration=Timecode(duration))
+
+		if isinstance(tc_start, int):
+			# Frame numbers (Ex: from a batch parse) don't need a Timecode until one is asked for
+			self._tc         = None
+			self._start_frame = tc_start
+			self._duration   = int(getattr(duration, "frame_number", duration))
+			self._rate       = rate
+			self._drop_frame = drop_frame
+		else:
+			self._tc         = TimecodeRange(start=Timecode(tc_start), duration=Timecode(duration))
+			self._start_frame = self._tc.start.frame_number
+			self._duration   = self._tc.duration.frame_number
+			self._rate       = timecode_rate(self._tc.start)
+			self._drop_frame = timecode_drop_frame(tc_start)
+
 		self._track   = self._sanitize_string(track)
 		self._color   = MarkerColors(color)
 		self._comment = self._sanitize_string(comment)
 		self._user    = self._sanitize_string(user)
+
+		self._fingerprint = None
 	
 	@property
 	def name(self) -> str:
@@ -105,8 +225,32 @@ class Marker:
 	@property
 	def timecode(self) -> TimecodeRange:
 		"""The timecode range of the marker"""
+
+		if self._tc is None:
+			self._tc = TimecodeRange(start=Timecode(self._start_frame), duration=Timecode(self._duration))
+
 		return copy.copy(self._tc)
 	
+	@property
+	def start_frame(self) -> int:
+		"""The start timecode of the marker, as a frame number"""
+		return self._start_frame
+	
+	@property
+	def duration_frames(self) -> int:
+		"""The duration of the marker, in frames"""
+		return self._duration
+	
+	@property
+	def rate(self) -> int:
+		"""The nominal frame rate of the marker's timecode"""
+		return self._rate
+	
+	@property
+	def drop_frame(self) -> bool:
+		"""Whether the marker's timecode is written as drop-frame"""
+		return self._drop_frame
+	
 	@property
 	def track(self) -> str:
 		"""The track on which this marker is set"""
@@ -122,14 +266,19 @@ class Marker:
 		"""The marker comment"""
 		return self._comment
 	
+	@property
+	def user(self) -> str:
+		"""The user who created the marker"""
+		return self._user
+	
 	@property
 	def is_spanned(self) -> bool:
 		"""Is this a spanned marker"""
-		return self.timecode.duration.frame_number > 1
+		return self._duration > 1
 		
 	@classmethod
-	def from_string(cls, line:str) -> "Marker":
-		"""Create a marker from a line in a marker list"""
+	def fields_from_string(cls, line:str) -> typing.Tuple[str, str, str, str, str, str, str]:
+		"""Split a line in a marker list into name, start TC, track, color, comment, duration and user"""
 		m = line.split('\t')
 		"""
 		Fields:
@@ -139,24 +288,48 @@ class Marker:
 		Color
 		Comment
 		Duration (frames)
+		User (V2)
+		Color (V2)
 		"""
 
+		# Plain split for well-formed lines; the parsers sort out the rest (Ex: tabs in comments)
+		if len(m) == 8 and m[0] and m[2] and m[5].isdigit() and m[7].isalpha():
+			return m[0], m[1], m[2], m[7].lower(), m[4], m[5], m[6]
+		elif len(m) == 6 and m[0] and m[2] and m[5].isdigit() and m[3].isalpha():
+			return m[0], m[1], m[2], m[3].lower(), m[4], m[5], ""
+
 		for parser in MarkerListParsers.values():
 
 			if match := parser.match(line):
 
-				return cls(
-					name = match.group("name"),
-					tc_start = match.group("tc_start"),
-					track = match.group("track"),
-					color = match.group("color").lower(),
-					comment = match.group("comment"),
-					duration = match.group("duration"),
-					user = match.group("user") if "user" in match.groupdict() else "",
+				return (
+					match.group("name"),
+					match.group("tc_start"),
+					match.group("track"),
+					match.group("color").lower(),
+					match.group("comment"),
+					match.group("duration"),
+					match.group("user") if "user" in match.groupdict() else "",
 				)
 		
 		else:
 			raise ValueError("Unknown marker list format")
+
+	@classmethod
+	def from_string(cls, line:str) -> "Marker":
+		"""Create a marker from a line in a marker list"""
+
+		name, tc_start, track, color, comment, duration, user = cls.fields_from_string(line)
+
+		return cls(
+			name = name,
+			tc_start = tc_start,
+			track = track,
+			color = color,
+			comment = comment,
+			duration = duration,
+			user = user,
+		)
 	
 	def __str__(self) -> str:
 
@@ -164,11 +337,11 @@ class Marker:
 		
 		return "\t".join([
 			self.name,
-			str(self.timecode.start),
+			format_timecode(self._start_frame, self._rate, self._drop_frame),
 			self.track,
 			self.color.value.title() if self.color in LEGACY_MARKER_SET else "Yellow",
 			self.comment,
-			str(self.timecode.duration.frame_number),
+			str(self._duration),
 			self._user,
 			self.color.value.title()
 		])
@@ -179,28 +352,72 @@ class Marker:
 	def __eq__(self, other) -> bool:
 		
 		if isinstance(other, self.__class__):
-			return self.timecode.start == other.timecode.start
+			return self._identity() == other._identity()
 		else:
 			return self.timecode.start == other
 	
 	def __lt__(self, other) -> bool:
 
 		if isinstance(other, self.__class__):
-			return self.timecode.start < other.timecode.start
+			return self._start_frame < other._start_frame
 		else:
 			return self.timecode.start < other
 
-	def __hash__(self) -> str:
-		return hash(self.name, self.track, self.timecode, self.comment)
+	def __hash__(self) -> int:
+		# Markers are equal if everything about them is the same, not just their start time
+		return hash(self._identity())
+	
+	def _identity(self) -> tuple:
+		"""Everything that makes a marker this marker (also what the fingerprint is made from)"""
+		return (self._name, self._start_frame, self._duration, self._track, self._color, self._comment, self._user)
+	
+	@property
+	def fingerprint(self) -> bytes:
+		"""A digest of everything about the marker, the same from run to run"""
+
+		if self._fingerprint is None:
+			self._fingerprint = hashlib.blake2b("\t".join([
+				self._name, str(self._start_frame), str(self._duration), self._track, self._color.value, self._comment, self._user
+			]).encode("utf-8"), digest_size=16).digest()
 		
+		return self._fingerprint
 	
 	@classmethod
 	def _sanitize_string(cls, text:str) -> str:
 		"""Don't try anything silly"""
 
+		# Nearly everything is already fine
+		if text.isprintable():
+			return text
 
 		return str().join(s if str(s).isprintable() else " " for s in  text)
 
+@dataclasses.dataclass
+class MarkerFilter:
+	"""Markers to keep while parsing a marker list (`None` keeps all)"""
+
+	colors:typing.Optional[typing.AbstractSet[MarkerColors]] = None
+	"""Marker colors to keep"""
+	tracks:typing.Optional[typing.AbstractSet[str]] = None
+	"""Tracks to keep (Ex: "TC1", "V1")"""
+	users:typing.Optional[typing.AbstractSet[str]] = None
+	"""Marker users to keep"""
+
+	def __post_init__(self):
+
+		# Compare against the raw fields in the marker list
+		self._color_names = {MarkerColors(c).value for c in self.colors} if self.colors is not None else None
+		self._tracks_lower = {t.lower() for t in self.tracks} if self.tracks is not None else None
+
+	def accepts(self, track:str, color:str, user:str) -> bool:
+		"""Check the raw fields of a marker against this filter"""
+
+		return (
+			(self._color_names is None or color.lower() in self._color_names) and
+			(self._tracks_lower is None or track.lower() in self._tracks_lower) and
+			(self.users is None or user in self.users)
+		)
+
 @dataclasses.dataclass
 class MarkerChangeReport:
 	"""A comparison between two markers for the same shot"""
@@ -214,155 +431,907 @@ class MarkerChangeReport:
 	relative_offset:typing.Optional[Timecode] = None
 	"""Adjusted/relative change between the two lists"""
 
-def vfx_id_from_marker(marker:Marker) -> str|None:
+@dataclasses.dataclass(frozen=True, slots=True)
+class MarkerChange:
+	"""A compact, immutable comparison between two markers for the same shot"""
+
+	change_type:ChangeTypes
+	"""The type of change between markers"""
+	marker_old:typing.Optional[Marker] = None
+	"""The marker from the old list"""
+	marker_new:typing.Optional[Marker] = None
+	"""The marker from the new list"""
+	offset_frames:typing.Optional[int] = None
+	"""Adjusted/relative change between the two lists, in frames"""
+	confidence:float = 1.0
+	"""How sure the match between shot IDs is (less than 1 for fuzzy matches)"""
+
+	@property
+	def relative_offset(self) -> typing.Optional[Timecode]:
+		"""Adjusted/relative change between the two lists"""
+		return Timecode(self.offset_frames) if self.offset_frames is not None else None
+
+@dataclasses.dataclass
+class ChangeSummary:
+	"""Statistics about a change list, gathered as changes are added"""
+
+	change_counts:dict[ChangeTypes, int] = dataclasses.field(default_factory=lambda: {change_type: 0 for change_type in ChangeTypes})
+	"""Number of changes, per change type"""
+	max_absolute_offset:typing.Optional[int] = None
+	"""Largest absolute offset of a matched shot, in frames (keeping its sign)"""
+	max_relative_offset:typing.Optional[int] = None
+	"""Largest relative offset of a matched shot, in frames (keeping its sign)"""
+	first_change_frame:typing.Optional[int] = None
+	"""Earliest timecode of an added, changed or deleted shot, in frames"""
+	last_change_frame:typing.Optional[int] = None
+	"""Latest timecode of an added, changed or deleted shot, in frames"""
+	rate:int = DEFAULT_RATE
+	"""Frame rate for formatting the timecodes and offsets"""
+
+	def add(self, change_type:ChangeTypes, frame:int, absolute_offset:typing.Optional[int]=None, relative_offset:typing.Optional[int]=None) -> None:
+		"""Count a change at the given frame"""
+
+		self.change_counts[change_type] += 1
+
+		if absolute_offset is not None and (self.max_absolute_offset is None or abs(absolute_offset) > abs(self.max_absolute_offset)):
+			self.max_absolute_offset = absolute_offset
+		
+		if relative_offset is not None and (self.max_relative_offset is None or abs(relative_offset) > abs(self.max_relative_offset)):
+			self.max_relative_offset = relative_offset
+		
+		if change_type == ChangeTypes.UNCHANGED:
+			return
+		
+		if self.first_change_frame is None or frame < self.first_change_frame:
+			self.first_change_frame = frame
+		
+		if self.last_change_frame is None or frame > self.last_change_frame:
+			self.last_change_frame = frame
+	
+	@property
+	def has_changes(self) -> bool:
+		"""Whether any shots were added, changed or renamed"""
+		return bool(self.change_counts[ChangeTypes.CHANGED] or self.change_counts[ChangeTypes.ADDED] or self.change_counts[ChangeTypes.RENAMED])
+	
+	def write(self, file_output:typing.Optional[typing.TextIO]=None) -> None:
+		"""Print the summary (to the screen by default)"""
+
+		def tc(frames:typing.Optional[int], signed:bool=False) -> str:
+			if frames is None:
+				return "-"
+			return ("+" if signed and frames > 0 else "") + format_timecode(frames, self.rate)
+
+		for change_type in ChangeTypes:
+			print(f"{change_type.name.title() + ':':<25}{self.change_counts[change_type]}", file=file_output)
+		
+		print(f"{'Largest offset:':<25}{tc(self.max_absolute_offset, signed=True)}", file=file_output)
+		print(f"{'Largest relative offset:':<25}{tc(self.max_relative_offset, signed=True)}", file=file_output)
+		print(f"{'First change:':<25}{tc(self.first_change_frame)}", file=file_output)
+		print(f"{'Last change:':<25}{tc(self.last_change_frame)}", file=file_output)
+
+class ChangeSet(typing.Sequence[MarkerChange]):
+	"""Changes between two marker lists, stored as parallel arrays of change types, marker indexes and offsets
+
+	Rows index into `markers_old` and `markers_new`, with `-1` for no marker.  Iterate over `rows()` to avoid
+	creating an object per change; indexing or iterating the set itself creates `MarkerChange`s on demand.
+	"""
+
+	def __init__(self, markers_old:typing.Sequence[Marker], markers_new:typing.Sequence[Marker]):
+
+		self._markers_old = markers_old
+		self._markers_new = markers_new
+
+		self._change_types = array.array("b")
+		self._old_indexes  = array.array("q")
+		self._new_indexes  = array.array("q")
+		self._offsets      = array.array("q")
+		self._confidences  = array.array("d")
+
+		self._summary = ChangeSummary()
+
+		# Shot ID lookup of the old list and the pattern used to build it, kept by `build_marker_changes()` for `update_marker_changes()`
+		self._marker_lookup_old:typing.Optional[dict[str, int]] = None
+		self._shot_id_pattern:typing.Optional[str] = None
+	
+	@property
+	def summary(self) -> ChangeSummary:
+		"""Statistics about the changes so far"""
+		return self._summary
+	
+	@property
+	def markers_old(self) -> typing.Sequence[Marker]:
+		"""The old marker list"""
+		return self._markers_old
+	
+	@property
+	def markers_new(self) -> typing.Sequence[Marker]:
+		"""The new marker list"""
+		return self._markers_new
+	
+	@property
+	def change_types(self) -> array.array:
+		"""The `ChangeTypes` value of each change"""
+		return self._change_types
+	
+	@property
+	def old_indexes(self) -> array.array:
+		"""Index of each change's marker in the old list, or `-1`"""
+		return self._old_indexes
+	
+	@property
+	def new_indexes(self) -> array.array:
+		"""Index of each change's marker in the new list, or `-1`"""
+		return self._new_indexes
+	
+	@property
+	def offsets(self) -> array.array:
+		"""Relative offset of each change, in frames (`0` for added and deleted markers)"""
+		return self._offsets
+	
+	@property
+	def confidences(self) -> array.array:
+		"""How sure each match between shot IDs is (less than 1 for fuzzy matches)"""
+		return self._confidences
+
+	def append(self, change_type:ChangeTypes, old_index:int=-1, new_index:int=-1, offset_frames:int=0, confidence:float=1.0) -> None:
+		"""Add a change"""
+
+		self._change_types.append(change_type)
+		self._old_indexes.append(old_index)
+		self._new_indexes.append(new_index)
+		self._offsets.append(offset_frames)
+		self._confidences.append(confidence)
+
+		marker_old = self._markers_old[old_index] if old_index >= 0 else None
+		marker_new = self._markers_new[new_index] if new_index >= 0 else None
+
+		if len(self._change_types) == 1:
+			self._summary.rate = (marker_new or marker_old).rate
+
+		if marker_old and marker_new:
+			self._summary.add(change_type, marker_new.start_frame, marker_new.start_frame - marker_old.start_frame, offset_frames)
+		else:
+			self._summary.add(change_type, (marker_new or marker_old).start_frame)
+
+	def rows(self) -> typing.Iterator[typing.Tuple[ChangeTypes, typing.Optional[Marker], typing.Optional[Marker], typing.Optional[int]]]:
+		"""Iterate over (change type, old marker, new marker, offset frames) without creating `MarkerChange`s"""
+
+		change_types = {c.value: c for c in ChangeTypes}
+		matched = (ChangeTypes.CHANGED.value, ChangeTypes.UNCHANGED.value, ChangeTypes.RENAMED.value)
+
+		for change_type, old_index, new_index, offset in zip(self._change_types, self._old_indexes, self._new_indexes, self._offsets):
+			yield (
+				change_types[change_type],
+				self._markers_old[old_index] if old_index >= 0 else None,
+				self._markers_new[new_index] if new_index >= 0 else None,
+				offset if change_type in matched else None
+			)
+
+	def view(self, change_types:typing.Iterable[ChangeTypes]) -> "ChangeSet":
+		"""A change set of only the given change types, sharing the same marker lists"""
+
+		wanted = {c.value for c in change_types}
+		view = self.__class__(self._markers_old, self._markers_new)
+
+		for row in zip(self._change_types, self._old_indexes, self._new_indexes, self._offsets, self._confidences):
+			if row[0] in wanted:
+				view.append(*row)
+
+		return view
+
+	def to_bytes(self) -> bytes:
+		"""Serialize the change set, with its marker lists, as compressed JSON"""
+
+		def marker_fields(marker:Marker) -> list:
+			return [marker.name, marker.start_frame, marker.track, marker.color.value, marker.comment, marker.duration_frames, marker.user, marker.rate, marker.drop_frame]
+
+		return zlib.compress(json.dumps({
+			"markers_old":  [marker_fields(m) for m in self._markers_old],
+			"markers_new":  [marker_fields(m) for m in self._markers_new],
+			"change_types": self._change_types.tolist(),
+			"old_indexes":  self._old_indexes.tolist(),
+			"new_indexes":  self._new_indexes.tolist(),
+			"offsets":      self._offsets.tolist(),
+			"confidences":  self._confidences.tolist(),
+		}, separators=(",",":")).encode("utf-8"))
+
+	@classmethod
+	def from_bytes(cls, data:bytes) -> "ChangeSet":
+		"""Restore a change set serialized with `to_bytes()`"""
+
+		fields = json.loads(zlib.decompress(data))
+
+		def markers(marker_fields:list) -> typing.List[Marker]:
+			return [Marker(name=name, tc_start=int(tc_start), track=track, color=color, comment=comment, duration=duration, user=user, rate=rate, drop_frame=drop_frame) for name, tc_start, track, color, comment, duration, user, rate, drop_frame in marker_fields]
+		
+		change_set = cls(markers(fields["markers_old"]), markers(fields["markers_new"]))
+
+		for row in zip(fields["change_types"], fields["old_indexes"], fields["new_indexes"], fields["offsets"], fields["confidences"]):
+			change_set.append(*row)
+
+		return change_set
+
+	def __len__(self) -> int:
+		return len(self._change_types)
+
+	def __getitem__(self, index):
+
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+
+		change_type = ChangeTypes(self._change_types[index])
+		old_index, new_index = self._old_indexes[index], self._new_indexes[index]
+
+		return MarkerChange(
+			change_type = change_type,
+			marker_old = self._markers_old[old_index] if old_index >= 0 else None,
+			marker_new = self._markers_new[new_index] if new_index >= 0 else None,
+			offset_frames = self._offsets[index] if change_type in (ChangeTypes.CHANGED, ChangeTypes.UNCHANGED, ChangeTypes.RENAMED) else None,
+			confidence = self._confidences[index]
+		)
+
+	def __iter__(self) -> typing.Iterator[MarkerChange]:
+		for row, confidence in zip(self.rows(), self._confidences):
+			yield MarkerChange(*row, confidence)
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} changes={len(self)}>"
+
+def change_rows(markers_changes:typing.Iterable[typing.Union[MarkerChangeReport,MarkerChange]]) -> typing.Iterator[typing.Tuple[ChangeTypes, typing.Optional[Marker], typing.Optional[Marker], typing.Optional[int]]]:
+	"""Iterate over (change type, old marker, new marker, offset frames) for any kind of change list"""
+
+	if isinstance(markers_changes, ChangeSet):
+		yield from markers_changes.rows()
+		return
+
+	for marker_change in markers_changes:
+		yield (
+			marker_change.change_type,
+			marker_change.marker_old,
+			marker_change.marker_new,
+			marker_change.relative_offset.frame_number if marker_change.relative_offset is not None else None
+		)
+
+def vfx_id_from_marker(marker:Marker, shot_id_pattern:typing.Optional[re.Pattern]=None) -> str|None:
 	"""Return the VFX ID found in the marker, or `None`"""
 
-	match = PAT_VFX_MARKER.match(marker.comment)
+	match = (shot_id_pattern or get_shot_id_pattern()).match(marker.comment)
 
-	return match.group() if match else None
+	if not match:
+		return None
+	
+	# Patterns not built by get_shot_id_pattern() match the shot ID as a whole
+	return match.group(SHOT_ID_GROUP) if SHOT_ID_GROUP in match.re.groupindex else match.group(0).strip()
 	
-def get_marker_list_from_file(file_input:typing.TextIO) -> typing.List[Marker]:
-	"""Parse a marker list from a file pointer"""
+def _iter_marker_fields(lines:typing.Iterable[str], shot_id_pattern:re.Pattern, marker_filter:typing.Optional[MarkerFilter], require_shot_id:bool) -> typing.Iterator[typing.Tuple[int, str, str, str, str, str, str, str]]:
+	"""(line number, name, start TC, track, color, comment, duration, user) of each wanted marker, one line at a time"""
+
+	for idx, line in enumerate(map(lambda l: l.rstrip('\n'), lines)):
+		try:
+			name, tc_start, track, color, comment, duration, user = Marker.fields_from_string(line)
+		except Exception as e:
+			raise MarkerParseError(idx+1, e)
+
+		# Reject unwanted markers before doing the expensive stuff
+		if marker_filter and not marker_filter.accepts(track=track, color=color, user=user):
+			continue
+
+		comment = Marker._sanitize_string(comment)
+		if require_shot_id and not shot_id_pattern.match(comment):
+			continue
+
+		yield (idx+1, name, tc_start, track, color, comment, duration, user)
+
+def get_marker_list_from_file(file_input:typing.TextIO, shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[MarkerFilter]=None, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.List[Marker]:
+	"""Parse a marker list from a file pointer (only markers with shot IDs, unless `require_shot_id` is `False`), at `rate` or the rate detected from its timecodes"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	return markers_from_fields(list(_iter_marker_fields(file_input, shot_id_pattern, marker_filter, require_shot_id)), rate)
+
+MARKER_BATCH_SIZE = 1024
+"""Markers to convert at a time when parsing one line at a time, so timecodes are still converted in batches"""
+
+def iter_marker_list_from_file(file_input:typing.Iterable[str], marker_filter:typing.Optional[MarkerFilter]=None, shot_id_pattern:typing.Optional[re.Pattern]=None, require_shot_id:bool=False, rate:typing.Optional[int]=None) -> typing.Iterator[Marker]:
+	"""Parse markers (with or without shot IDs, unless `require_shot_id` is `True`) a batch of lines at a time from a marker list already sorted by start timecode
+
+	Without a `rate`, the rate is detected from the first batch, and used for the rest of the list.
+	"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	marker_fields = _iter_marker_fields(file_input, shot_id_pattern, marker_filter, require_shot_id)
+	previous_frame = None
+
+	while batch := list(itertools.islice(marker_fields, MARKER_BATCH_SIZE)):
+
+		rate = rate or detect_rate(fields[2] for fields in batch)
+
+		for (line_number, *_), marker in zip(batch, markers_from_fields(batch, rate)):
+
+			# Anything out of order would need the whole list in memory to sort
+			if previous_frame is not None and marker.start_frame < previous_frame:
+				raise MarkerParseError(line_number, "Markers are not sorted by start timecode")
+			previous_frame = marker.start_frame
+
+			yield marker
+
+def iter_marker_lines(file_input:typing.BinaryIO, legacy_encoding:str=LEGACY_ENCODING) -> typing.Iterator[str]:
+	"""Decode a marker list file opened in binary mode one line at a time, the same way `get_marker_list_from_bytes` decodes it"""
+
+	head = file_input.read(len(BOM_UTF8))
+	file_input.seek(0)
+
+	# UTF-16 can't be split on single-byte newlines
+	if head[:2] in BOMS_UTF16:
+		yield from io.TextIOWrapper(file_input, encoding="utf-16")
+		return
+
+	if head == BOM_UTF8:
+		file_input.seek(len(BOM_UTF8))
+
+	for line in file_input:
+		yield decode_marker_text(line.rstrip(b"\r\n"), legacy_encoding)
+
+def markers_from_fields(marker_fields:typing.Sequence[typing.Tuple[int, str, str, str, str, str, str, str]], rate:typing.Optional[int]=None) -> typing.List[Marker]:
+	"""Build markers from (line number, name, start TC, track, color, comment, duration, user), converting all timecodes in one batch at `rate` (or the rate detected from them)"""
+
+	rate = rate or detect_rate(fields[2] for fields in marker_fields)
+
+	try:
+		start_frames = parse_timecodes([fields[2] for fields in marker_fields], rate)
+	except TimecodeParseError as e:
+		raise MarkerParseError(marker_fields[e.index][0], e) from None
 
 	markers = []
 
-	for idx, line in enumerate(map(lambda l: l.rstrip('\n'), file_input)):
+	for (line_number, name, tc_start, track, color, comment, duration, user), start_frame in zip(marker_fields, start_frames):
 		try:
-			marker = Marker.from_string(line)
+			markers.append(Marker(name=name, tc_start=start_frame, track=track, color=color, comment=comment, duration=int(duration), user=user, rate=rate, drop_frame=";" in tc_start))
 		except Exception as e:
-			raise ValueError(f"Cannot parse marker on line {idx+1}: {e}")
+			raise MarkerParseError(line_number, e)
 
-		# TODO: Add filtering? Ex: Filter only blue markers
-		# if marker.color != MarkerColors.BLUE:
-		#	continue
+	return markers
 
-		# NOTE FOR NOW: Hard coding to ABC1234
-		if vfx_id_from_marker(marker):
-			markers.append(marker)
-	
+def decode_marker_text(data:bytes, legacy_encoding:str=LEGACY_ENCODING) -> str:
+	"""Decode a field of a marker list as UTF-8, or the legacy encoding if that fails (or Latin-1, for bytes the legacy encoding doesn't have)"""
+
+	try:
+		return data.decode("utf-8")
+	except UnicodeDecodeError:
+		pass
+
+	try:
+		return data.decode(legacy_encoding)
+	except UnicodeDecodeError:
+		return data.decode("latin-1")
+
+def get_marker_list_from_bytes(data:bytes, shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[MarkerFilter]=None, require_shot_id:bool=True, legacy_encoding:str=LEGACY_ENCODING, rate:typing.Optional[int]=None) -> typing.List[Marker]:
+	"""Parse a marker list from its raw contents, sorted by start timecode
+
+	Each field is decoded on its own with `decode_marker_text()`, the same as the memory-mapped reader does.
+	"""
+
+	from locatorator import reader
+
+	# UTF-16 can't be scanned for single-byte tabs and newlines
+	if data[:2] in BOMS_UTF16:
+		markers = get_marker_list_from_file(io.StringIO(data.decode("utf-16")), shot_id_pattern, marker_filter, require_shot_id, rate)
+	else:
+		start = len(BOM_UTF8) if data.startswith(BOM_UTF8) else 0
+		markers = reader.parse_marker_range(data, start, len(data), 1, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate)
+
+	markers.sort(key=lambda x:x.start_frame)
 	return markers
 
-def build_marker_lookup(marker_list:typing.Iterable[Marker]) -> dict[str, Marker]:
-	"""Build a dict based on marker comments"""
+def get_marker_list_from_path(path_input:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[MarkerFilter]=None, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.List[Marker]:
+	"""Parse a marker list from a file path, sorted by start timecode"""
+
+	if os.path.getsize(path_input) >= MAPPED_READER_THRESHOLD:
+		from locatorator import reader
+		return reader.get_marker_list_from_mapped_file(path_input, shot_id_pattern, marker_filter, require_shot_id=require_shot_id, rate=rate)
+
+	return get_marker_list_from_bytes(pathlib.Path(path_input).read_bytes(), shot_id_pattern, marker_filter, require_shot_id, rate=rate)
+
+def _read_marker_list_bytes(path_input:typing.Union[str,pathlib.Path]) -> typing.Optional[bytes]:
+	"""Read a marker list small enough to parse from memory, or `None` if it's big enough for the memory-mapped reader"""
+
+	if os.path.getsize(path_input) >= MAPPED_READER_THRESHOLD:
+		return None
+	return pathlib.Path(path_input).read_bytes()
+
+def identical_prefix_length(markers_old:typing.Sequence[Marker], markers_new:typing.Sequence[Marker]) -> int:
+	"""The number of markers at the start of two marker lists which are exactly the same"""
+
+	# Marker by marker, so nothing past the first difference is looked at (or hashed)
+	length = 0
+	for marker_old, marker_new in zip(markers_old, markers_new):
+		if marker_old._identity() != marker_new._identity():
+			break
+		length += 1
+	
+	return length
+
+def get_marker_lists_from_paths(path_old:typing.Union[str,pathlib.Path], path_new:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[MarkerFilter]=None, executor:typing.Optional[concurrent.futures.Executor]=None, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.Tuple[typing.List[Marker], typing.List[Marker]]:
+	"""Read and parse the old and new marker lists concurrently (only markers with shot IDs, unless `require_shot_id` is `False`)
+
+	Both are read at `rate`, or the rate detected from them.  Uses a thread pool unless another `executor` is given.
+	Raises `MarkerListLoadError` naming the list that failed.
+	"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+
+	# Read both at once, so re-compares of unchanged files can be spotted from what was read and only parsed once
+	with concurrent.futures.ThreadPoolExecutor(max_workers=2) as reader_pool:
+		futures = [reader_pool.submit(_read_marker_list_bytes, path) for path in (path_old, path_new)]
+		datas = []
+		for side, future in zip(("Old", "New"), futures):
+			try:
+				datas.append(future.result())
+			except Exception as e:
+				raise MarkerListLoadError(side, e) from e
+	
+	if datas[0] is not None and datas[0] == datas[1]:
+		try:
+			markers = get_marker_list_from_bytes(datas[0], shot_id_pattern, marker_filter, require_shot_id, rate=rate)
+		except Exception as e:
+			raise MarkerListLoadError("Old", e) from e
+		return markers, list(markers)
+
+	paths = (path_old, path_new)
+	pool = executor or concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+	def submit(idx:int, rate:typing.Optional[int]) -> concurrent.futures.Future:
+		if datas[idx] is not None:
+			return pool.submit(get_marker_list_from_bytes, datas[idx], shot_id_pattern, marker_filter, require_shot_id, rate=rate)
+		return pool.submit(get_marker_list_from_path, paths[idx], shot_id_pattern, marker_filter, require_shot_id, rate)
+
+	try:
+		futures = [submit(idx, rate) for idx in range(2)]
+		marker_lists = []
+
+		for side, future in zip(("Old", "New"), futures):
+			try:
+				marker_lists.append(future.result())
+			except Exception as e:
+				raise MarkerListLoadError(side, e) from e
+		
+		if rate is None:
+			marker_lists = marker_lists_at_same_rate(marker_lists, lambda idx, rate: submit(idx, rate).result())
+
+	finally:
+		if executor is None:
+			pool.shutdown(wait=False, cancel_futures=True)
+
+	return tuple(marker_lists)
+
+def marker_lists_at_same_rate(marker_lists:typing.Sequence[typing.List[Marker]], parse:typing.Callable[[int, int], typing.List[Marker]]) -> typing.List[typing.List[Marker]]:
+	"""Marker lists at the rate detected from any of them, with `parse(index, rate)` reading a list again if its rate was lower
+
+	Both lists are of the same cut, but one may never reach the frame numbers which give its rate away.
+	"""
+
+	marker_lists = list(marker_lists)
+	rates = [markers[0].rate if markers else None for markers in marker_lists]
+	rate = max(filter(None, rates), default=None)
+
+	for idx, (side, rate_list) in enumerate(zip(("Old", "New"), rates)):
+		if rate_list is not None and rate_list != rate:
+			try:
+				marker_lists[idx] = parse(idx, rate)
+			except Exception as e:
+				raise MarkerListLoadError(side, e) from e
+	
+	return marker_lists
+
+def _build_marker_index_lookup(marker_list:typing.Sequence[Marker], shot_id_pattern:re.Pattern) -> dict[str, int]:
+	"""Build a dict of list indexes based on marker comments"""
 
 	marker_lookup = {}
-	for marker in marker_list:
+	for idx, marker in enumerate(marker_list):
 		# TODO: Think about shot IDs occurring more than once in a list
 
 		
 		# NOTE: Combine this somehow with is_valid_marker
-		vfx_id = vfx_id_from_marker(marker)
+		vfx_id = vfx_id_from_marker(marker, shot_id_pattern)
 
 		if not vfx_id:
 			raise ValueError(f"VFX ID not found in marker: {marker.comment}")
 
 		if vfx_id in marker_lookup:
 			raise ValueError(f"Shot ID \"{vfx_id}\" was found more than once in the same list.")
-		marker_lookup[vfx_id] = marker
+		marker_lookup[vfx_id] = idx
 	
 	return marker_lookup
 
-def build_marker_changes(markers_old:typing.Iterable[Marker], markers_new:typing.Iterable[Marker]) -> typing.List[MarkerChangeReport]:
-	"""Build matches of old and new markers"""
+def build_marker_lookup(marker_list:typing.Iterable[Marker], shot_id_pattern:typing.Optional[re.Pattern]=None) -> dict[str, Marker]:
+	"""Build a dict based on marker comments"""
+
+	marker_list = list(marker_list)
+	return {vfx_id: marker_list[idx] for vfx_id, idx in _build_marker_index_lookup(marker_list, shot_id_pattern or get_shot_id_pattern()).items()}
+
+def _append_marker_changes(marker_changes:ChangeSet, marker_lookup_old:dict[str, int], marker_lookup_new:typing.Iterable[typing.Tuple[str, int]], running_offset:int=0, fuzzy_matches:typing.Optional[dict[str, typing.Tuple[str, float]]]=None) -> None:
+	"""Match new markers against the unmatched old markers by shot ID, then add the old markers left over as deleted"""
+
+	markers_old = marker_changes.markers_old
+	markers_new = marker_changes.markers_new
+	fuzzy_matches = fuzzy_matches or {}
+
+	for vfx_id, idx_new in marker_lookup_new:
+
+		idx_old = marker_lookup_old.pop(vfx_id, None)
+		confidence = 1.0
+
+		if idx_old is None and vfx_id in fuzzy_matches:
+			vfx_id_old, confidence = fuzzy_matches[vfx_id]
+			idx_old = marker_lookup_old.pop(vfx_id_old)
+
+		if idx_old is None:
+			absolute_offset = 0
+			relative_offset = -running_offset
+			marker_changes.append(ChangeTypes.ADDED, new_index=idx_new)
+		else:
+			absolute_offset = markers_new[idx_new].start_frame - markers_old[idx_old].start_frame
+			relative_offset = absolute_offset - running_offset
+			# A fuzzy match that hasn't moved still needs reporting
+			if relative_offset:
+				change_type = ChangeTypes.CHANGED
+			else:
+				change_type = ChangeTypes.RENAMED if confidence < 1 else ChangeTypes.UNCHANGED
+			marker_changes.append(change_type, idx_old, idx_new, relative_offset, confidence)
+
+		if relative_offset != 0:
+			running_offset = absolute_offset
+	
+	# Add any remaining shots in marker_lookup_old that went unmatched to the markers_new list
+	for _, idx_old in marker_lookup_old.items():
+		marker_changes.append(ChangeTypes.DELETED, old_index=idx_old)
+
+def build_marker_changes(markers_old:typing.Iterable[Marker], markers_new:typing.Iterable[Marker], shot_id_pattern:typing.Optional[re.Pattern]=None, fuzzy_min_confidence:typing.Optional[float]=None) -> ChangeSet:
+	"""Build matches of old and new markers (pairing up near-identical shot IDs too, if `fuzzy_min_confidence` is given)"""
 
 	# TODO: This still feels like it's doing too much
 
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	markers_old = list(markers_old)
+	markers_new = list(markers_new)
+
 	try:
-		marker_lookup_old = build_marker_lookup(markers_old)
+		marker_lookup_old = _build_marker_index_lookup(markers_old, shot_id_pattern)
 	except ValueError as e:
 		raise ValueError("Old marker list: " + str(e)) from e
+
+	marker_changes = ChangeSet(markers_old, markers_new)
+	marker_changes._marker_lookup_old = dict(marker_lookup_old)
+	marker_changes._shot_id_pattern = shot_id_pattern.pattern
+	
+	# Nothing has moved at the start of the lists, or at all if they're the same
+	prefix_length = identical_prefix_length(markers_old, markers_new)
+
+	if prefix_length == len(markers_old) == len(markers_new):
+		for idx in marker_lookup_old.values():
+			marker_changes.append(ChangeTypes.UNCHANGED, idx, idx, 0)
+		return marker_changes
 	
 	try:
-		marker_lookup_new = build_marker_lookup(markers_new)
+		marker_lookup_new = _build_marker_index_lookup(markers_new, shot_id_pattern)
 	except ValueError as e:
 		raise ValueError("New marker list: " + str(e)) from e
 
-	running_offset = Timecode(0) # The total number of frames offset from the beginning
-	marker_pairs = []
+	# Renamed or mistyped shots would otherwise be both added and deleted
+	fuzzy_matches = {}
+	if fuzzy_min_confidence is not None:
+		from locatorator import fuzzy
+		fuzzy_matches = {
+			vfx_id_new: (vfx_id_old, confidence)
+			for vfx_id_old, vfx_id_new, confidence in fuzzy.find_fuzzy_matches(
+				[vfx_id for vfx_id in marker_lookup_old if vfx_id not in marker_lookup_new],
+				[vfx_id for vfx_id in marker_lookup_new if vfx_id not in marker_lookup_old],
+				fuzzy_min_confidence
+			)
+		}
 
-	for vfx_id, marker_new in marker_lookup_new.items():
+	lookup_new = iter(marker_lookup_new.items())
 
-		# TODO: Rework as `if marker_new.comment.lower() not in marker_lookup_old:`?
-		marker_old = marker_lookup_old.get(vfx_id)
-		absolute_offset = marker_new.timecode.start - marker_old.timecode.start if marker_old else 0
-		relative_offset = absolute_offset-running_offset
+	# The same markers at the same indexes in both lists
+	for vfx_id, idx_new in itertools.islice(lookup_new, prefix_length):
+		del marker_lookup_old[vfx_id]
+		marker_changes.append(ChangeTypes.UNCHANGED, idx_new, idx_new, 0)
 
-		if not marker_old:
-			change_report = MarkerChangeReport(
-				change_type = ChangeTypes.ADDED,
-				marker_new = marker_new
-			)
+	_append_marker_changes(marker_changes, marker_lookup_old, lookup_new, 0, fuzzy_matches)
+	
+	return marker_changes
+
+def window_frame_numbers(window_start:typing.Optional[typing.Union[int,str,Timecode]], window_end:typing.Optional[typing.Union[int,str,Timecode]], markers:typing.Iterable[Marker]=()) -> typing.Tuple[typing.Optional[int], typing.Optional[int]]:
+	"""The frame numbers of a timecode window's bounds, with timecode strings read at the rate of the markers
+
+	Raises `TimecodeWindowError` if a bound isn't a valid timecode, the window is empty, or the markers don't all
+	share a rate to read it at.
+	"""
+
+	rate, drop_frame = DEFAULT_RATE, None
+
+	if isinstance(window_start, str) or isinstance(window_end, str):
+		rates = {(marker.rate, marker.drop_frame) for marker in markers}
+		if len(rates) > 1:
+			raise TimecodeWindowError("The marker lists mix frame rates, so the window's timecodes can't be read")
+		if rates:
+			rate, drop_frame = rates.pop()
+
+	frames = []
+	for name, bound in (("start", window_start), ("end", window_end)):
+		try:
+			frames.append(to_frame_number(bound, rate, drop_frame) if bound is not None else None)
+		except (ValueError, AttributeError) as e:
+			raise TimecodeWindowError(f"Window {name}: {e}") from e
+
+	if None not in frames and frames[1] <= frames[0]:
+		raise TimecodeWindowError("The window must end after it starts")
+
+	return tuple(frames)
+
+def build_marker_changes_in_window(markers_old:typing.Sequence[Marker], markers_new:typing.Sequence[Marker], window_start:typing.Optional[typing.Union[int,str,Timecode]]=None, window_end:typing.Optional[typing.Union[int,str,Timecode]]=None, shot_id_pattern:typing.Optional[re.Pattern]=None) -> ChangeSet:
+	"""Build matches of old and new markers, but only report shots starting from `window_start` up to (not including) `window_end`
+
+	Both lists must be sorted by start timecode.  Shots are still matched by shot ID across both whole lists, since a
+	shot in the window may have moved from anywhere in the old cut, and the running offset picks up from the last
+	shot before the window.  Deleted shots are reported if they started within the window in the old cut.
+	"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	markers_old = list(markers_old)
+	markers_new = list(markers_new)
+
+	frame_start, frame_end = window_frame_numbers(window_start, window_end, itertools.chain(markers_old, markers_new))
+
+	def window_indexes(markers:typing.Sequence[Marker]) -> range:
+		starts = [marker.start_frame for marker in markers]
+		return range(
+			bisect.bisect_left(starts, frame_start) if frame_start is not None else 0,
+			bisect.bisect_left(starts, frame_end) if frame_end is not None else len(starts)
+		)
+
+	try:
+		marker_lookup_old = _build_marker_index_lookup(markers_old, shot_id_pattern)
+	except ValueError as e:
+		raise ValueError("Old marker list: " + str(e)) from e
+
+	try:
+		marker_lookup_new = _build_marker_index_lookup(markers_new, shot_id_pattern)
+	except ValueError as e:
+		raise ValueError("New marker list: " + str(e)) from e
+
+	window_old = window_indexes(markers_old)
+	window_new = window_indexes(markers_new)
+
+	vfx_ids_new = {idx: vfx_id for vfx_id, idx in marker_lookup_new.items()}
+
+	# The running offset is always the absolute offset of the shot before (added shots haven't moved)
+	running_offset = 0
+	if window_new.start:
+		idx_old = marker_lookup_old.get(vfx_ids_new[window_new.start - 1])
+		if idx_old is not None:
+			running_offset = markers_new[window_new.start - 1].start_frame - markers_old[idx_old].start_frame
+
+	# Old shots the window's new shots could match, and old shots from the window that aren't anywhere in the new cut
+	vfx_ids_window = {vfx_ids_new[idx] for idx in window_new}
+	marker_lookup_old = {
+		vfx_id: idx_old for vfx_id, idx_old in marker_lookup_old.items()
+		if vfx_id in vfx_ids_window or (idx_old in window_old and vfx_id not in marker_lookup_new)
+	}
+
+	marker_changes = ChangeSet(markers_old, markers_new)
+	_append_marker_changes(marker_changes, marker_lookup_old, ((vfx_ids_new[idx], idx) for idx in window_new), running_offset)
+
+	return marker_changes
+
+PARALLEL_TRACKS_THRESHOLD = 20000
+"""Marker lists with fewer markers than this have their tracks compared in this process, since starting a process pool would take longer"""
+
+def _compare_track(markers_old:typing.List[Marker], markers_new:typing.List[Marker], shot_id_pattern:re.Pattern, fuzzy_min_confidence:typing.Optional[float]) -> typing.List[tuple]:
+	"""Compare one track's markers, returning just the rows so the markers needn't be sent back (runs in a worker)"""
+
+	changes = build_marker_changes(markers_old, markers_new, shot_id_pattern, fuzzy_min_confidence)
+	return list(zip(changes.change_types, changes.old_indexes, changes.new_indexes, changes.offsets, changes.confidences))
+
+def build_marker_changes_by_track(markers_old:typing.Iterable[Marker], markers_new:typing.Iterable[Marker], shot_id_pattern:typing.Optional[re.Pattern]=None, fuzzy_min_confidence:typing.Optional[float]=None, executor:typing.Optional[concurrent.futures.Executor]=None) -> typing.Tuple[ChangeSet, dict[str, ChangeSet]]:
+	"""Match old and new markers separately on each track, so offsets on one track don't carry over to another
+
+	Large lists with several tracks have them compared in a process pool, unless another `executor` is given.
+	Returns the changes for all tracks in timecode order, and the changes for each track.
+	"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	markers_old = list(markers_old)
+	markers_new = list(markers_new)
+
+	# Indexes of each track's markers in the full lists
+	tracks_old:dict[str, typing.List[int]] = {}
+	tracks_new:dict[str, typing.List[int]] = {}
+	for idx, marker in enumerate(markers_old):
+		tracks_old.setdefault(marker.track, []).append(idx)
+	for idx, marker in enumerate(markers_new):
+		tracks_new.setdefault(marker.track, []).append(idx)
+	
+	tracks = sorted(tracks_old.keys() | tracks_new.keys())
+	track_markers = {track: ([markers_old[idx] for idx in tracks_old.get(track, [])], [markers_new[idx] for idx in tracks_new.get(track, [])]) for track in tracks}
+
+	# Comparing is CPU-bound, so threads would only take turns
+	if executor is None and (len(tracks) < 2 or len(markers_old) + len(markers_new) < PARALLEL_TRACKS_THRESHOLD):
+		pool = None
+	else:
+		pool = executor or concurrent.futures.ProcessPoolExecutor(max_workers=min(len(tracks), os.cpu_count() or 1))
+
+	try:
+		if pool is None:
+			futures = {}
 		else:
-			change_report = MarkerChangeReport(
-				change_type = ChangeTypes.CHANGED if relative_offset.frame_number else ChangeTypes.UNCHANGED,
-				marker_old = marker_old,
-				marker_new = marker_new,
-				relative_offset = relative_offset
-			)
-			del marker_lookup_old[vfx_id]
+			futures = {track: pool.submit(_compare_track, *track_markers[track], shot_id_pattern, fuzzy_min_confidence) for track in tracks}
 
-		if relative_offset != 0:
-			running_offset = absolute_offset
+		track_changes = {}
+		for track in tracks:
+			try:
+				rows = futures[track].result() if pool is not None else _compare_track(*track_markers[track], shot_id_pattern, fuzzy_min_confidence)
+			except ValueError as e:
+				raise ValueError(f"Track {track}: {e}") from e
+			
+			track_changes[track] = ChangeSet(*track_markers[track])
+			for row in rows:
+				track_changes[track].append(*row)
+	
+	finally:
+		if executor is None and pool is not None:
+			pool.shutdown(wait=False, cancel_futures=True)
 
-		marker_pairs.append(change_report)
+	# Merge the tracks back together in timecode order, indexing into the full lists
+	rows = []
+	for track, changes in track_changes.items():
+		idxs_old, idxs_new = tracks_old.get(track, []), tracks_new.get(track, [])
+		for change_type, idx_old, idx_new, offset, confidence in zip(changes.change_types, changes.old_indexes, changes.new_indexes, changes.offsets, changes.confidences):
+			idx_old = idxs_old[idx_old] if idx_old >= 0 else -1
+			idx_new = idxs_new[idx_new] if idx_new >= 0 else -1
+			frame = markers_new[idx_new].start_frame if idx_new >= 0 else markers_old[idx_old].start_frame
+			rows.append((frame, track, change_type, idx_old, idx_new, offset, confidence))
 	
-	# Add any remaining shots in marker_lookup_old that went unmatched to the markers_new list
-	for _, marker_old in marker_lookup_old.items():
-		marker_pairs.append(MarkerChangeReport(
-				change_type = ChangeTypes.DELETED,
-				marker_old = marker_old
-		))
+	rows.sort(key=lambda row: row[:2])
+
+	marker_changes = ChangeSet(markers_old, markers_new)
+	for _, _, *row in rows:
+		marker_changes.append(*row)
 	
-	return marker_pairs
+	return marker_changes, track_changes
+
+def update_marker_changes(previous:ChangeSet, markers_new:typing.Iterable[Marker], shot_id_pattern:typing.Optional[re.Pattern]=None, fuzzy_min_confidence:typing.Optional[float]=None) -> ChangeSet:
+	"""Compare the same old markers against a new version of the new markers, reusing the previous changes where the new lists start the same"""
+
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+	markers_old = previous.markers_old
+	markers_new = list(markers_new)
+
+	# Fuzzy matches depend on every unmatched shot, so can't be reused piecemeal
+	if previous._marker_lookup_old is None or previous._shot_id_pattern != shot_id_pattern.pattern or fuzzy_min_confidence is not None or any(c < 1 for c in previous.confidences):
+		return build_marker_changes(markers_old, markers_new, shot_id_pattern, fuzzy_min_confidence)
+
+	prefix_length = identical_prefix_length(previous.markers_new, markers_new)
+
+	marker_changes = ChangeSet(markers_old, markers_new)
+	marker_changes._marker_lookup_old = previous._marker_lookup_old
+	marker_changes._shot_id_pattern = previous._shot_id_pattern
+
+	marker_lookup_old = dict(previous._marker_lookup_old)
+	vfx_ids_old = {idx: vfx_id for vfx_id, idx in marker_lookup_old.items()}
+	vfx_ids_prefix = set()
+	running_offset = 0
+
+	# Changes to the new markers before the first difference stay the same, in the same order
+	for change_type, idx_old, idx_new, offset, confidence in zip(previous.change_types, previous.old_indexes, previous.new_indexes, previous.offsets, previous.confidences):
+
+		if not 0 <= idx_new < prefix_length:
+			break
+
+		marker_changes.append(change_type, idx_old, idx_new, offset, confidence)
+
+		if change_type == ChangeTypes.ADDED:
+			vfx_ids_prefix.add(vfx_id_from_marker(markers_new[idx_new], shot_id_pattern))
+			absolute_offset, relative_offset = 0, -running_offset
+		else:
+			vfx_ids_prefix.add(vfx_ids_old[idx_old])
+			del marker_lookup_old[vfx_ids_old[idx_old]]
+			absolute_offset, relative_offset = markers_new[idx_new].start_frame - markers_old[idx_old].start_frame, offset
 
-def write_change_list(markers_changes:typing.Iterable[MarkerChangeReport], file_output:typing.TextIO, marker_name="Locatorator", marker_track:str="TC1", marker_color:MarkerColors=MarkerColors.WHITE, change_types:typing.Iterable[ChangeTypes]|None=None):
+		if relative_offset != 0:
+			running_offset = absolute_offset
+
+	# Everything from the first difference on is compared again
+	try:
+		marker_lookup_new = {vfx_id: idx + prefix_length for vfx_id, idx in _build_marker_index_lookup(markers_new[prefix_length:], shot_id_pattern).items()}
+		for vfx_id in vfx_ids_prefix.intersection(marker_lookup_new):
+			raise ValueError(f"Shot ID \"{vfx_id}\" was found more than once in the same list.")
+	except ValueError as e:
+		raise ValueError("New marker list: " + str(e)) from e
+
+	_append_marker_changes(marker_changes, marker_lookup_old, marker_lookup_new.items(), running_offset)
+
+	return marker_changes
+
+def write_change_list(markers_changes:typing.Iterable[typing.Union[MarkerChangeReport,MarkerChange]], file_output:typing.TextIO, marker_name="Locatorator", marker_track:str="TC1", marker_color:MarkerColors=MarkerColors.WHITE, change_types:typing.Iterable[ChangeTypes]|None=None, shot_id_pattern:typing.Optional[re.Pattern]=None):
 	"""Write changes to a new marker list"""
 
-	change_types = set(change_types) or {ChangeTypes.ADDED, ChangeTypes.CHANGED, ChangeTypes.DELETED}
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
 
+	change_types = set(change_types or []) or {ChangeTypes.ADDED, ChangeTypes.CHANGED, ChangeTypes.DELETED, ChangeTypes.RENAMED}
 
-	for marker_change in markers_changes:
+
+	for change_type, marker_old, marker_new, offset_frames in change_rows(markers_changes):
 		
 
-		if marker_change.change_type not in change_types:
+		if change_type not in change_types:
 			continue
 
-		vfx_id = vfx_id_from_marker(marker_change.marker_new) if marker_change.change_type == ChangeTypes.ADDED else vfx_id_from_marker(marker_change.marker_old)
+		vfx_id = vfx_id_from_marker(marker_new, shot_id_pattern) if change_type == ChangeTypes.ADDED else vfx_id_from_marker(marker_old, shot_id_pattern)
 
-		if marker_change.change_type == ChangeTypes.ADDED:
-			comment=f"{vfx_id} - Shot added: {marker_change.marker_new.comment}"
+		if change_type == ChangeTypes.ADDED:
+			comment=f"{vfx_id} - Shot added: {marker_new.comment}"
+		
+		elif change_type == ChangeTypes.CHANGED:
+			comment=f"{vfx_id} - Cut change near {marker_old.comment} ({'+' if offset_frames > 0 else ''}{format_timecode(offset_frames, marker_new.rate)})"
+			
+			# Fuzzy matches
+			vfx_id_new = vfx_id_from_marker(marker_new, shot_id_pattern)
+			if vfx_id_new != vfx_id:
+				comment += f" - Now {vfx_id_new}"
 		
-		elif marker_change.change_type == ChangeTypes.CHANGED:
-			comment=f"{vfx_id} - Cut change near {marker_change.marker_old.comment} ({'+' if marker_change.relative_offset.frame_number > 0 else ''}{marker_change.relative_offset})"
+		elif change_type == ChangeTypes.DELETED:
+			comment=f"{vfx_id} - Shot removed since last cut: {marker_old.comment}"
 		
-		elif marker_change.change_type == ChangeTypes.DELETED:
-			comment=f"{vfx_id} - Shot removed since last cut: {marker_change.marker_old.comment}"
+		elif change_type == ChangeTypes.UNCHANGED:
+			comment=f"{vfx_id} - Shot unchanged since last cut: {marker_old.comment}"
 		
-		elif marker_change.change_type == ChangeTypes.UNCHANGED:
-			comment=f"{vfx_id} - Shot unchanged since last cut: {marker_change.marker_old.comment}"
+		elif change_type == ChangeTypes.RENAMED:
+			comment=f"{vfx_id} - Shot renamed since last cut: Now {vfx_id_from_marker(marker_new, shot_id_pattern)}"
 		
 		else:
-			raise ValueError(f"Unknown Change Type: {marker_change.change_type}")
+			raise ValueError(f"Unknown Change Type: {change_type}")
 
 		marker_output = Marker(
 			name=marker_name,
 			color=marker_color,
-			tc_start=str(marker_change.marker_new.timecode.start if marker_change.marker_new else marker_change.marker_old.timecode.start),
+			tc_start=(marker_new or marker_old).start_frame,
 			duration=1,
 			track=marker_track,
-			comment=comment
+			comment=comment,
+			rate=(marker_new or marker_old).rate,
+			drop_frame=(marker_new or marker_old).drop_frame,
 		)
 
 		print(marker_output, file=file_output)
 	
-def print_change_list(markers_changes) -> None:
+def write_marker_list(markers:typing.Iterable[Marker], file_output:typing.TextIO) -> None:
+	"""Write markers as an importable marker list"""
+
+	for marker in markers:
+		print(marker, file=file_output)
+
+def print_change_list(markers_changes:typing.Iterable[typing.Union[MarkerChangeReport,MarkerChange]], shot_id_pattern:typing.Optional[re.Pattern]=None, file_output:typing.Optional[typing.TextIO]=None) -> None:
 	"""Print changes to screen"""
 
-	print("")
-	print("Shot ID               Old Version    New Version   Offset since last change")
-	print("--------------------- -----------    -----------   ------------------------")
+	shot_id_pattern = shot_id_pattern or get_shot_id_pattern()
+
+	print("", file=file_output)
+	print("Shot ID               Old Version    New Version   Offset since last change", file=file_output)
+	print("--------------------- -----------    -----------   ------------------------", file=file_output)
+
+	for change_type, marker_old, marker_new, offset_frames in change_rows(markers_changes):
+
+		vfx_id = vfx_id_from_marker(marker_new or marker_old, shot_id_pattern)
+		tc_old = format_timecode(marker_old.start_frame, marker_old.rate, marker_old.drop_frame) if marker_old else ""
+		tc_new = format_timecode(marker_new.start_frame, marker_new.rate, marker_new.drop_frame) if marker_new else ""
+
+		if change_type == ChangeTypes.ADDED:
+			change = "Shot added"
+		elif change_type == ChangeTypes.DELETED:
+			change = "Shot removed"
+		else:
+			change = ("+" if offset_frames > 0 else "") + format_timecode(offset_frames, marker_new.rate)
 
-	for _, comment in markers_changes:
-		print(comment)
+		print(f"{vfx_id:<21} {tc_old:<11}    {tc_new:<11}   {change}", file=file_output)
 	
-	print("")
\ No newline at end of file
+	print("", file=file_output)
\ No newline at end of file
@@ -1,45 +1,271 @@
-import sys
+import sys, os, re, argparse, pathlib, tempfile
 import locatorator
-	
-def print_change_list(markers_changes) -> None:
-	"""Print changes to screen"""
 
-	print("")
-	print("Shot ID               Old Version    New Version   Offset since last change")
-	print("--------------------- -----------    -----------   ------------------------")
+def add_shot_id_arguments(parser:argparse.ArgumentParser) -> None:
+	"""Add options for choosing shot ID patterns"""
+
+	parser.add_argument("--shot-id-patterns", metavar="FILE", help="Load additional shot ID patterns from a file of tab-separated name and regex lines")
+	parser.add_argument("--shot-id", metavar="NAME", action="append", help="Only match shot IDs using this named pattern (may be repeated; default: all patterns)")
+
+def shot_id_pattern_from_args(args:argparse.Namespace) -> re.Pattern:
+	"""Load and compile the shot ID patterns chosen on the command line"""
+
+	if args.shot_id_patterns:
+		with open(args.shot_id_patterns) as file_patterns:
+			locatorator.load_shot_id_patterns(file_patterns)
+
+	return locatorator.get_shot_id_pattern(args.shot_id)
+
+def add_filter_arguments(parser:argparse.ArgumentParser) -> None:
+	"""Add options for filtering markers while parsing"""
+
+	parser.add_argument("--color", action="append", type=str.lower, choices=[c.value for c in locatorator.MarkerColors], help="Only use markers of this color (may be repeated)")
+	parser.add_argument("--track", action="append", help="Only use markers on this track (may be repeated)")
+	parser.add_argument("--user", action="append", help="Only use markers set by this user (may be repeated)")
+
+def marker_filter_from_args(args:argparse.Namespace) -> locatorator.MarkerFilter|None:
+	"""Build a marker filter from the options given on the command line"""
+
+	if not any((args.color, args.track, args.user)):
+		return None
+
+	return locatorator.MarkerFilter(
+		colors = {locatorator.MarkerColors(c) for c in args.color} if args.color else None,
+		tracks = set(args.track) if args.track else None,
+		users  = set(args.user) if args.user else None,
+	)
+
+def main_batch(args:list[str]) -> None:
+	"""Compare many marker list pairs from a manifest"""
+
+	from locatorator import batch
+
+	parser = argparse.ArgumentParser(prog=f"{__package__} batch", description="Compare many marker list pairs listed in a manifest")
+	parser.add_argument("manifest", help="Tab-separated file of old, new and output paths, one pair per line")
+	parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+	parser.add_argument("-o", "--output", default="batch_summary.txt", help="Path to write the batch summary")
+	add_shot_id_arguments(parser)
+	add_filter_arguments(parser)
+	parsed = parser.parse_args(args)
+	shot_id_pattern = shot_id_pattern_from_args(parsed)
+
+	path_manifest = pathlib.Path(parsed.manifest)
+	with path_manifest.open() as file_manifest:
+		jobs = batch.read_manifest(file_manifest, base_path=path_manifest.parent)
+
+	results = batch.run_batch(jobs, max_workers=parsed.jobs, shot_id_pattern=shot_id_pattern, marker_filter=marker_filter_from_args(parsed))
+
+	with open(parsed.output, "w") as file_output:
+		batch.write_batch_summary(results, file_output)
+
+	failures = [r for r in results if r.error]
+	for result in failures:
+		print(f"{result.job.path_old} vs {result.job.path_new}: {result.error}", file=sys.stderr)
+
+	print(f"Compared {len(results)-len(failures)} of {len(results)} marker list pairs. Summary output to {parsed.output}")
+
+def main_serve(args:list[str]) -> None:
+	"""Run a local comparison server"""
+
+	from locatorator import server
+
+	parser = argparse.ArgumentParser(prog=f"{__package__} serve", description="Run a local comparison server that keeps parsed marker lists in memory")
+	parser.add_argument("--host", default=server.DEFAULT_HOST, help="Address to listen on (default: %(default)s)")
+	parser.add_argument("--port", type=int, default=server.DEFAULT_PORT, help="Port to listen on (default: %(default)s)")
+	parser.add_argument("--socket", default=None, help="Listen on this Unix socket path instead of a port")
+	parser.add_argument("--cache-size", type=int, default=server.DEFAULT_CACHE_SIZE, help="Number of parsed marker lists to keep in memory (default: %(default)s)")
+	add_shot_id_arguments(parser)
+	parsed = parser.parse_args(args)
+
+	with server.create_server(host=parsed.host, port=parsed.port, socket_path=parsed.socket, cache_size=parsed.cache_size, shot_id_pattern=shot_id_pattern_from_args(parsed)) as comparison_server:
+
+		print(f"Listening on {parsed.socket or f'http://{parsed.host}:{parsed.port}'}")
+		try:
+			comparison_server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+
+def main_dropfolder(args:list[str]) -> None:
+	"""Compare marker lists as they're dropped in a folder"""
+
+	from locatorator import dropfolder
+
+	parser = argparse.ArgumentParser(prog=f"{__package__} dropfolder", description="Watch a folder for marker list exports, and compare each one against the previous version of its reel")
+	parser.add_argument("folder", help="Folder to watch for marker lists")
+	parser.add_argument("-o", "--output", default=None, help="Folder to write change lists to (default: a \"changes\" folder inside the watched folder)")
+	parser.add_argument("--log", default=None, help=f"Path to write a JSON line per marker list, with its timing (default: {dropfolder.DEFAULT_LOG_NAME} in the output folder)")
+	parser.add_argument("--pattern", default=dropfolder.DEFAULT_FILE_PATTERN, help="File names to treat as marker lists (default: %(default)s)")
+	parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+	parser.add_argument("--cache-size", type=int, default=dropfolder.DEFAULT_MAX_REELS, help="Number of reels to keep parsed in memory (default: %(default)s)")
+	add_shot_id_arguments(parser)
+	add_filter_arguments(parser)
+	parsed = parser.parse_args(args)
+
+	path_output = parsed.output or pathlib.Path(parsed.folder, "changes")
+
+	with dropfolder.DropFolder(parsed.folder, path_output, path_log=parsed.log, max_reels=parsed.cache_size, max_workers=parsed.jobs, shot_id_pattern=shot_id_pattern_from_args(parsed), marker_filter=marker_filter_from_args(parsed), file_pattern=parsed.pattern) as drop_folder:
 
-	for _, comment in markers_changes:
-		print(comment)
+		print(f"Watching {parsed.folder} for marker lists (Ctrl+C to stop)...")
+		try:
+			drop_folder.run()
+		except KeyboardInterrupt:
+			pass
+
+def main_merge(args:list[str]) -> None:
+	"""Merge several marker lists into one"""
+
+	from locatorator import merge, timecodes
+
+	parser = argparse.ArgumentParser(prog=f"{__package__} merge", description="Merge marker lists (each sorted by timecode, as exported) into one importable marker list")
+	parser.add_argument("markerlists", nargs="+", help="The marker lists to merge")
+	parser.add_argument("-o", "--output", default="merged.txt", help="Path to write the merged marker list")
+	parser.add_argument("--dedupe", action="store_true", help="Leave out markers identical to one already at the same timecode")
+	parser.add_argument("--rate", type=int, choices=timecodes.STANDARD_RATES, default=None, help="Frame rate of the marker lists' timecodes (default: detected from each list)")
+	add_filter_arguments(parser)
+	parsed = parser.parse_args(args)
+
+	# Write alongside the output first, so a list which fails partway through doesn't leave half a marker list behind
+	path_output = pathlib.Path(parsed.output)
+	with tempfile.NamedTemporaryFile("w", dir=path_output.parent, prefix=f".{path_output.name}.", suffix=".tmp", delete=False) as file_output:
+		path_temp = pathlib.Path(file_output.name)
+		try:
+			merge.merge_marker_list_paths(parsed.markerlists, file_output, parsed.dedupe, marker_filter_from_args(parsed), rate=parsed.rate)
+		except BaseException:
+			file_output.close()
+			path_temp.unlink(missing_ok=True)
+			raise
 	
-	print("")
+	# Temporary files are only readable by their owner, unlike a file opened normally
+	umask = os.umask(0)
+	os.umask(umask)
+	os.chmod(path_temp, 0o666 & ~umask)
+
+	os.replace(path_temp, path_output)
+	print(f"Merged marker list output to {parsed.output}")
 
 def main() -> None:
 	"""Markers"""
 
-	if len(sys.argv) < 3:
-		sys.exit(f"Usage: {__package__} markerlist.txt comparelist.txt")
+	commands = {
+		"batch": main_batch,
+		"serve": main_serve,
+		"dropfolder": main_dropfolder,
+		"merge": main_merge,
+	}
+
+	if len(sys.argv) > 1 and sys.argv[1] in commands:
+		return commands[sys.argv[1]](sys.argv[2:])
+
+	from locatorator import fuzzy, timecodes
+
+	parser = argparse.ArgumentParser(prog=__package__, description="Compare two Avid marker lists", epilog=f"Other commands: {__package__} batch --help, {__package__} serve --help, {__package__} dropfolder --help, {__package__} merge --help")
+	parser.add_argument("markerlist", help="The old marker list")
+	parser.add_argument("comparelist", help="The new marker list")
+	parser.add_argument("-o", "--output", default="changes.txt", help="Path to write the change list")
+	parser.add_argument("--parse-jobs", type=int, default=None, help="Parse each large marker list in chunks across this many processes")
+	parser.add_argument("--rate", type=int, choices=timecodes.STANDARD_RATES, default=None, help="Frame rate of the marker lists' timecodes (default: detected from the lists)")
+	parser.add_argument("--summary", action="store_true", help="Print the number of changes, largest offsets and first/last changed timecode")
+	parser.add_argument("--fuzzy", metavar="CONFIDENCE", type=float, nargs="?", const=fuzzy.DEFAULT_MIN_CONFIDENCE, default=None, help=f"Also pair up unmatched shot IDs that are alike (Ex: renamed), at least this similar (0-1, default {fuzzy.DEFAULT_MIN_CONFIDENCE})")
+	parser.add_argument("--by-track", action="store_true", help="Compare the markers on each track separately")
+	parser.add_argument("--start", metavar="TIMECODE", help="Only report shots starting at or after this timecode")
+	parser.add_argument("--end", metavar="TIMECODE", help="Only report shots starting before this timecode")
+	parser.add_argument("--watch", action="store_true", help="Keep comparing whenever either marker list changes, until stopped with Ctrl+C")
+	parser.add_argument("--carry-over", metavar="FILE", help="Also move every marker from the old list (with or without a shot ID) to its place in the new cut, and write them to this marker list")
+	add_shot_id_arguments(parser)
+	add_filter_arguments(parser)
+	args = parser.parse_args()
+	shot_id_pattern = shot_id_pattern_from_args(args)
+	marker_filter = marker_filter_from_args(args)
+
+	# Carried-over markers are remapped by every shot, not just those in the window
+	if (args.start or args.end) and (args.fuzzy is not None or args.by_track or args.watch or args.carry_over):
+		parser.error("--start and --end can't be used with --fuzzy, --by-track, --watch or --carry-over")
+	
+	if args.watch and (args.by_track or args.summary or args.carry_over or args.parse_jobs):
+		parser.error("--watch can't be used with --by-track, --summary, --carry-over or --parse-jobs")
+
+	if args.watch:
+		from locatorator import watch
+
+		watcher = watch.ComparisonWatcher(args.markerlist, args.comparelist, args.output, shot_id_pattern, marker_filter, args.fuzzy)
+		watcher.refresh()
+		print(f"Marker list output to {args.output}")
+		print("Watching for changes (Ctrl+C to stop)...")
+
+		try:
+			watcher.run()
+		except KeyboardInterrupt:
+			pass
+		return
 
 	# Load in the marker lists
-	with open(sys.argv[1]) as file_markers:
-		markers_old = locatorator.get_marker_list_from_file(file_markers)
-	markers_old.sort(key=lambda x:x.timecode.start)
+	if args.parse_jobs:
+		from locatorator import reader
+
+		# Each list gets the whole pool to itself
+		paths = (args.markerlist, args.comparelist)
+		parse = lambda idx, rate: reader.get_marker_list_from_mapped_file_parallel(paths[idx], shot_id_pattern, marker_filter, max_workers=args.parse_jobs, require_shot_id=not args.carry_over, rate=rate)
 		
-	with open(sys.argv[2]) as file_markers:
-		markers_new = locatorator.get_marker_list_from_file(file_markers)
-	markers_new.sort(key=lambda x:x.timecode.start)
-	
+		marker_lists = []
+		for idx, side in enumerate(("Old", "New")):
+			try:
+				marker_lists.append(parse(idx, args.rate))
+			except Exception as e:
+				raise locatorator.MarkerListLoadError(side, e) from e
+		
+		if args.rate is None:
+			marker_lists = locatorator.marker_lists_at_same_rate(marker_lists, parse)
+		markers_old, markers_new = marker_lists
+
+	else:
+		markers_old, markers_new = locatorator.get_marker_lists_from_paths(args.markerlist, args.comparelist, shot_id_pattern, marker_filter, require_shot_id=not args.carry_over, rate=args.rate)
+
+	# Carrying markers over needs every old marker, but only those with shot IDs are compared
+	if args.carry_over:
+		markers_all = markers_old
+		markers_old = [marker for marker in markers_old if shot_id_pattern.match(marker.comment)]
+		markers_new = [marker for marker in markers_new if shot_id_pattern.match(marker.comment)]
+
 	# Pair markers together by comment (shot id)
-	markers_changes = locatorator.build_marker_changes(markers_old, markers_new)
+	if args.start or args.end:
+		try:
+			markers_changes, track_changes = locatorator.build_marker_changes_in_window(markers_old, markers_new, args.start, args.end, shot_id_pattern), {}
+		except locatorator.TimecodeWindowError as e:
+			parser.error(str(e))
+	elif args.by_track:
+		markers_changes, track_changes = locatorator.build_marker_changes_by_track(markers_old, markers_new, shot_id_pattern, args.fuzzy)
+	else:
+		markers_changes, track_changes = locatorator.build_marker_changes(markers_old, markers_new, shot_id_pattern, args.fuzzy), {}
+
+	if args.summary:
+		markers_changes.summary.write()
+		for track, changes in track_changes.items():
+			print(f"\nTrack {track}:")
+			changes.summary.write()
+
+	if args.carry_over:
+		from locatorator import remap
+
+		timecode_remap = remap.TimecodeRemap.from_changes(markers_changes)
+		markers_carried, clamped = remap.carry_over_markers(markers_all, timecode_remap)
+
+		with open(args.carry_over, "w") as file_output:
+			locatorator.write_marker_list(markers_carried, file_output)
+
+		print(f"Carried-over marker list output to {args.carry_over}")
+
+		if clamped:
+			print(f"{clamped} carried-over marker(s) would have landed before {locatorator.format_timecode(0)}, so were placed there instead")
 
 	if not markers_changes:
 		print("No changes were detected.")
 		return
 
 	# Write changes to new marker list
-	with open("changes.txt", "w") as file_output:
-		locatorator.write_change_list(markers_changes, file_output)
-		
-	print("Marker list output to changes.txt")
+	with open(args.output, "w") as file_output:
+		locatorator.write_change_list(markers_changes, file_output, shot_id_pattern=shot_id_pattern)
+
+	print(f"Marker list output to {args.output}")
 
 def bootstrap():
 	"""Entrypoint via setup.py `entry_point`"""
@@ -0,0 +1,32 @@
+"""asyncio-friendly versions of the marker list API, run in an executor (or the loop's default executor)"""
+
+import typing, re, asyncio, pathlib, concurrent.futures
+import locatorator
+
+async def get_marker_list_from_path(path_input:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, executor:typing.Optional[concurrent.futures.Executor]=None) -> typing.List[locatorator.Marker]:
+	"""Read and parse a marker list from a file path, sorted by start timecode"""
+
+	return await asyncio.get_running_loop().run_in_executor(executor, locatorator.get_marker_list_from_path, path_input, shot_id_pattern or locatorator.get_shot_id_pattern())
+
+async def build_marker_changes(markers_old:typing.Iterable[locatorator.Marker], markers_new:typing.Iterable[locatorator.Marker], shot_id_pattern:typing.Optional[re.Pattern]=None, executor:typing.Optional[concurrent.futures.Executor]=None) -> locatorator.ChangeSet:
+	"""Build matches of old and new markers"""
+
+	# Snapshot the inputs so the caller is free to modify their lists meanwhile
+	return await asyncio.get_running_loop().run_in_executor(executor, locatorator.build_marker_changes, list(markers_old), list(markers_new), shot_id_pattern or locatorator.get_shot_id_pattern())
+
+async def compare_marker_lists(path_old:typing.Union[str,pathlib.Path], path_new:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, executor:typing.Optional[concurrent.futures.Executor]=None) -> locatorator.ChangeSet:
+	"""Load old and new marker lists concurrently, then compare them"""
+
+	shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+
+	results = await asyncio.gather(
+		get_marker_list_from_path(path_old, shot_id_pattern, executor),
+		get_marker_list_from_path(path_new, shot_id_pattern, executor),
+		return_exceptions=True
+	)
+
+	for side, result in zip(("Old", "New"), results):
+		if isinstance(result, BaseException):
+			raise locatorator.MarkerListLoadError(side, result) from result
+
+	return await build_marker_changes(*results, shot_id_pattern, executor)
@@ -0,0 +1,121 @@
+"""Compare many marker list pairs at once across a process pool"""
+
+import typing, re, pathlib, dataclasses, concurrent.futures
+import locatorator
+
+@dataclasses.dataclass
+class BatchJob:
+	"""An old/new marker list pair and where to write its changes"""
+
+	path_old:pathlib.Path
+	"""Path to the old marker list"""
+	path_new:pathlib.Path
+	"""Path to the new marker list"""
+	path_output:pathlib.Path
+	"""Path to write the change list"""
+
+@dataclasses.dataclass
+class BatchResult:
+	"""The outcome of a single batch job"""
+
+	job:BatchJob
+	"""The job that was run"""
+	change_counts:dict[locatorator.ChangeTypes, int] = dataclasses.field(default_factory=dict)
+	"""Number of changes found, per change type"""
+	error:typing.Optional[str] = None
+	"""Why the job failed, or `None` if it succeeded"""
+
+def read_manifest(file_input:typing.TextIO, base_path:typing.Union[str,pathlib.Path]="") -> typing.List[BatchJob]:
+	"""Read a tab-separated manifest of `old	new	output` paths, relative to `base_path`"""
+
+	base_path = pathlib.Path(base_path)
+	jobs = []
+
+	for idx, line in enumerate(map(lambda l: l.rstrip('\n'), file_input)):
+
+		if not line.strip() or line.lstrip().startswith("#"):
+			continue
+
+		fields = [f.strip() for f in line.split('\t')]
+		if len(fields) != 3 or not all(fields):
+			raise ValueError(f"Cannot parse manifest on line {idx+1}: Expected old, new and output paths separated by tabs")
+
+		jobs.append(BatchJob(*(base_path / f for f in fields)))
+
+	return jobs
+
+WORKER_CACHE_SIZE = 4
+"""Parsed marker lists each worker keeps, for jobs sharing a list (Ex: every reel compared against the same old cut)"""
+
+_worker_markers = None
+
+def _parse_in_worker(path:pathlib.Path, shot_id_pattern:re.Pattern, marker_filter:typing.Optional[locatorator.MarkerFilter]) -> typing.List[locatorator.Marker]:
+	"""Parse a marker list, or reuse it if this worker parsed it for an earlier job"""
+
+	global _worker_markers
+	if _worker_markers is None:
+		from locatorator.cache import LRUCache
+		_worker_markers = LRUCache(WORKER_CACHE_SIZE)
+
+	key = (path, shot_id_pattern.pattern)
+	markers = _worker_markers.get(key)
+
+	if markers is None:
+		markers = locatorator.get_marker_list_from_path(path, shot_id_pattern, marker_filter)
+		_worker_markers.put(key, markers)
+	
+	return markers
+
+def _compare_job(job:BatchJob, shot_id_pattern:re.Pattern, marker_filter:typing.Optional[locatorator.MarkerFilter]) -> BatchResult:
+	"""Parse and compare a marker list pair and write its changes (runs in a worker, so the lists never leave it)"""
+
+	marker_lists = []
+	for side, path in (("Old", job.path_old), ("New", job.path_new)):
+		try:
+			marker_lists.append(_parse_in_worker(path.resolve(), shot_id_pattern, marker_filter))
+		except Exception as e:
+			return BatchResult(job=job, error=str(locatorator.MarkerListLoadError(side, e)))
+
+	markers_changes = locatorator.build_marker_changes(*marker_lists, shot_id_pattern)
+
+	with open(job.path_output, "w") as file_output:
+		locatorator.write_change_list(markers_changes, file_output, shot_id_pattern=shot_id_pattern)
+
+	return BatchResult(job=job, change_counts=dict(markers_changes.summary.change_counts))
+
+def run_batch(jobs:typing.Iterable[BatchJob], max_workers:typing.Optional[int]=None, shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None) -> typing.List[BatchResult]:
+	"""Parse and compare all jobs in a process pool, each job in a single worker"""
+
+	# Resolve the pattern here, since worker processes may not share this process's registry
+	shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+	jobs = list(jobs)
+
+	# Jobs sharing an old list go out together, so they're likelier to land on a worker which already parsed it
+	order = sorted(range(len(jobs)), key=lambda idx: str(jobs[idx].path_old.resolve()))
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+		futures = {idx: executor.submit(_compare_job, jobs[idx], shot_id_pattern, marker_filter) for idx in order}
+
+		results = []
+		for idx, job in enumerate(jobs):
+			try:
+				results.append(futures[idx].result())
+			except Exception as e:
+				results.append(BatchResult(job=job, error=str(e)))
+
+	return results
+
+def write_batch_summary(results:typing.Iterable[BatchResult], file_output:typing.TextIO) -> None:
+	"""Write a tab-separated summary of batch results"""
+
+	print("\t".join(["Old", "New", "Output", *(c.name.title() for c in locatorator.ChangeTypes), "Status"]), file=file_output)
+
+	for result in results:
+		print("\t".join([
+			str(result.job.path_old),
+			str(result.job.path_new),
+			str(result.job.path_output),
+			*(str(result.change_counts.get(c, "")) for c in locatorator.ChangeTypes),
+			result.error or "OK"
+		]), file=file_output)
@@ -0,0 +1,257 @@
+"""Small in-memory caches for parsed marker lists and comparisons"""
+
+import typing, re, os, hashlib, pathlib, threading, collections, concurrent.futures
+import locatorator
+
+def content_hash(data:bytes) -> str:
+	"""Hash the raw contents of a marker list"""
+	return hashlib.sha256(data).hexdigest()
+
+class LRUCache:
+	"""A thread-safe, size-bounded least-recently-used cache"""
+
+	def __init__(self, max_size:int=32, on_evict:typing.Optional[typing.Callable[[typing.Hashable, typing.Any], None]]=None):
+
+		if max_size < 1:
+			raise ValueError("Cache size must be at least 1")
+
+		self._max_size = max_size
+		self._on_evict = on_evict
+		self._items = collections.OrderedDict()
+		self._lock = threading.Lock()
+
+		self._hits = 0
+		self._misses = 0
+
+	@property
+	def max_size(self) -> int:
+		"""The maximum number of items held in the cache"""
+		return self._max_size
+
+	@property
+	def hits(self) -> int:
+		"""Number of lookups found in the cache"""
+		return self._hits
+
+	@property
+	def misses(self) -> int:
+		"""Number of lookups not found in the cache"""
+		return self._misses
+
+	def get(self, key:typing.Hashable, default:typing.Any=None) -> typing.Any:
+		"""Get a cached item and mark it as recently used"""
+
+		with self._lock:
+			if key not in self._items:
+				self._misses += 1
+				return default
+
+			self._hits += 1
+			self._items.move_to_end(key)
+			return self._items[key]
+
+	def put(self, key:typing.Hashable, value:typing.Any) -> None:
+		"""Cache an item, evicting the least recently used item if full"""
+
+		evicted = []
+
+		with self._lock:
+			self._items[key] = value
+			self._items.move_to_end(key)
+
+			while len(self._items) > self._max_size:
+				evicted.append(self._items.popitem(last=False))
+		
+		# Outside the lock, in case the callback uses the cache
+		if self._on_evict:
+			for evicted_key, evicted_value in evicted:
+				self._on_evict(evicted_key, evicted_value)
+
+	def get_or_create(self, key:typing.Hashable, factory:typing.Callable[[], typing.Any]) -> typing.Any:
+		"""Get a cached item, or create and cache it with `factory()`"""
+
+		sentinel = object()
+		value = self.get(key, sentinel)
+
+		if value is sentinel:
+			value = factory()
+			self.put(key, value)
+
+		return value
+
+	def pop(self, key:typing.Hashable, default:typing.Any=None) -> typing.Any:
+		"""Remove an item from the cache"""
+
+		with self._lock:
+			return self._items.pop(key, default)
+
+	def clear(self) -> None:
+		"""Remove all items from the cache"""
+
+		with self._lock:
+			self._items.clear()
+
+	def __contains__(self, key:typing.Hashable) -> bool:
+		with self._lock:
+			return key in self._items
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._items)
+
+class ComparisonCache:
+	"""Remember the changes between marker list files, by content, until the files change"""
+
+	def __init__(self, max_size:int=16):
+
+		self._cache = LRUCache(max_size, on_evict=lambda key, _: self._forget(key))
+		self._lock = threading.Lock()
+
+		# Last known (mtime, size, hash) of each file, the cached comparisons using it, and the files each comparison used
+		self._file_hashes:dict[pathlib.Path, typing.Tuple[int, int, str]] = {}
+		self._file_keys:dict[pathlib.Path, set] = {}
+		self._key_paths:dict[typing.Hashable, typing.Set[pathlib.Path]] = {}
+
+	@property
+	def cache(self) -> LRUCache:
+		"""The cached comparisons"""
+		return self._cache
+
+	def _forget(self, key:typing.Hashable) -> None:
+		"""Stop tracking the files of a comparison which has left the cache"""
+
+		with self._lock:
+			for path in self._key_paths.pop(key, ()):
+				keys = self._file_keys.get(path)
+				if keys is None:
+					continue
+				keys.discard(key)
+				if not keys:
+					del self._file_keys[path]
+					self._file_hashes.pop(path, None)
+
+	def _read(self, path_input:pathlib.Path) -> typing.Tuple[typing.Tuple[int, int, str], bytes]:
+		"""Read a file and update its signature, returning both (comparisons with its previous contents are dropped)"""
+
+		stat = os.stat(path_input)
+		data = path_input.read_bytes()
+		signature = (stat.st_mtime_ns, stat.st_size, content_hash(data))
+
+		with self._lock:
+			known = self._file_hashes.get(path_input)
+			self._file_hashes[path_input] = signature
+			stale = self._file_keys.pop(path_input, set()) if known and known[2] != signature[2] else set()
+		
+		for key in stale:
+			self._cache.pop(key)
+			self._forget(key)
+		
+		return signature, data
+
+	def _known_or_read(self, path_input:pathlib.Path) -> typing.Tuple[str, typing.Optional[bytes]]:
+		"""A file's content hash, and its contents if it had to be read because it changed on disk since last time"""
+
+		stat = os.stat(path_input)
+
+		with self._lock:
+			known = self._file_hashes.get(path_input)
+		
+		if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+			return known[2], None
+
+		(_, _, file_hash), data = self._read(path_input)
+		return file_hash, data
+
+	@staticmethod
+	def _results(sides:typing.Sequence[str], futures:typing.Sequence[concurrent.futures.Future]) -> list:
+		"""Wait for a result per marker list, raising `MarkerListLoadError` naming the first that failed"""
+
+		results = []
+		for side, future in zip(sides, futures):
+			try:
+				results.append(future.result())
+			except Exception as e:
+				raise locatorator.MarkerListLoadError(side, e) from e
+		return results
+
+	def file_signature(self, path_input:typing.Union[str,pathlib.Path]) -> typing.Tuple[int, int, str]:
+		"""The (mtime, size, content hash) of a file, only re-reading it if it has changed on disk since last time"""
+
+		path_input = pathlib.Path(path_input).resolve()
+		stat = os.stat(path_input)
+
+		with self._lock:
+			known = self._file_hashes.get(path_input)
+		
+		if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+			return known
+
+		return self._read(path_input)[0]
+
+	def file_hash(self, path_input:typing.Union[str,pathlib.Path]) -> str:
+		"""Hash a file's contents, only re-reading it if it has changed on disk since last time"""
+		return self.file_signature(path_input)[2]
+
+	def compare(self, path_old:typing.Union[str,pathlib.Path], path_new:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional["locatorator.MarkerFilter"]=None, window_start:typing.Optional[str]=None, window_end:typing.Optional[str]=None, fuzzy_min_confidence:typing.Optional[float]=None) -> "locatorator.ChangeSet":
+		"""Compare two marker list files (only reporting shots within a timecode window, or pairing up renamed shots, if asked), or reuse the previous comparison of the same contents"""
+
+		shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+
+		if (window_start or window_end) and fuzzy_min_confidence is not None:
+			raise ValueError("Renamed shots can't be matched within a timecode window")
+		paths = tuple(pathlib.Path(p).resolve() for p in (path_old, path_new))
+
+		filter_key = marker_filter and tuple(None if f is None else frozenset(f) for f in (marker_filter.colors, marker_filter.tracks, marker_filter.users))
+		make_key = lambda hashes: (*hashes, shot_id_pattern.pattern, filter_key, window_start, window_end, fuzzy_min_confidence)
+
+		sides = ("Old", "New")
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+
+			# Both files at once, though files which haven't changed on disk needn't be read to find a cached comparison
+			hashes, datas = map(list, zip(*self._results(sides, [pool.submit(self._known_or_read, path) for path in paths])))
+			markers_changes = self._cache.get(make_key(hashes))
+
+			if markers_changes is None:
+
+				# Parse exactly the bytes that were hashed, in case a file changes in the meantime
+				unread = [idx for idx, data in enumerate(datas) if data is None]
+				rereads = self._results([sides[idx] for idx in unread], [pool.submit(self._read, paths[idx]) for idx in unread])
+				for idx, ((_, _, file_hash), data) in zip(unread, rereads):
+					hashes[idx], datas[idx] = file_hash, data
+
+				parse = lambda idx, rate=None: pool.submit(locatorator.get_marker_list_from_bytes, datas[idx], shot_id_pattern, marker_filter, rate=rate)
+
+				# The same contents on both sides only need parsing once
+				futures = {}
+				for idx, file_hash in enumerate(hashes):
+					if file_hash not in futures:
+						futures[file_hash] = parse(idx)
+				marker_lists = [list(markers) for markers in self._results(sides, [futures[file_hash] for file_hash in hashes])]
+
+				marker_lists = locatorator.marker_lists_at_same_rate(marker_lists, lambda idx, rate: parse(idx, rate).result())
+
+				if window_start or window_end:
+					markers_changes = locatorator.build_marker_changes_in_window(*marker_lists, window_start, window_end, shot_id_pattern)
+				else:
+					markers_changes = locatorator.build_marker_changes(*marker_lists, shot_id_pattern, fuzzy_min_confidence)
+
+				self._cache.put(make_key(hashes), markers_changes)
+
+		key = make_key(hashes)
+		with self._lock:
+			if key in self._cache:
+				self._key_paths.setdefault(key, set()).update(paths)
+				for path in paths:
+					self._file_keys.setdefault(path, set()).add(key)
+
+		return markers_changes
+
+	def clear(self) -> None:
+		"""Forget all comparisons and file hashes"""
+
+		with self._lock:
+			self._cache.clear()
+			self._file_hashes.clear()
+			self._file_keys.clear()
+			self._key_paths.clear()
@@ -0,0 +1,226 @@
+"""Compare each new marker list export dropped in a folder against the previous version of the same reel"""
+
+import typing, re, os, json, time, pathlib, threading, dataclasses, concurrent.futures
+import locatorator
+from locatorator import watch
+from locatorator.cache import LRUCache, content_hash
+
+PAT_REEL_VERSION = re.compile(r"^(?P<reel>.+?)[\s_.-]+v?(?P<version>(?<=v)\d+|\d{6,})$", re.IGNORECASE)
+"""Reel name and version from a file name (Ex: `R1_v003`, `Reel 2 - 20240105`, but not `Reel 100`)"""
+
+PAT_CHANGE_LIST = re.compile(r"^.+ vs .+$")
+"""File names of the change lists written, so they aren't taken for marker lists when written to the same folder"""
+
+DEFAULT_FILE_PATTERN = "*.txt"
+DEFAULT_MAX_REELS = 32
+DEFAULT_LOG_NAME = "dropfolder_log.jsonl"
+
+def reel_from_path(path:typing.Union[str,pathlib.Path]) -> typing.Tuple[str, typing.Optional[int]]:
+	"""The reel name and version number (if any) of a marker list, from its file name"""
+
+	stem = pathlib.Path(path).stem.strip()
+	match = PAT_REEL_VERSION.match(stem)
+
+	if not match:
+		return stem.lower(), None
+
+	return match.group("reel").strip().lower(), int(match.group("version"))
+
+@dataclasses.dataclass
+class IngestResult:
+	"""What happened to one dropped marker list"""
+
+	path:pathlib.Path
+	"""The dropped marker list"""
+	reel:str
+	"""The reel it's a version of"""
+	version:typing.Optional[int] = None
+	"""Its version number, if it has one"""
+	path_previous:typing.Optional[pathlib.Path] = None
+	"""The previous version it was compared against"""
+	path_output:typing.Optional[pathlib.Path] = None
+	"""Where its changes were written"""
+	change_counts:dict[locatorator.ChangeTypes, int] = dataclasses.field(default_factory=dict)
+	"""Number of changes found, per change type"""
+	error:typing.Optional[str] = None
+	"""Why it couldn't be compared, or `None`"""
+	latency:float = 0
+	"""Seconds from noticing the file had changed to finishing with it"""
+
+	def to_dict(self) -> dict:
+		"""A JSON-friendly summary"""
+
+		return {
+			"path": str(self.path),
+			"reel": self.reel,
+			"version": self.version,
+			"previous": str(self.path_previous) if self.path_previous else None,
+			"output": str(self.path_output) if self.path_output else None,
+			"changes": {change_type.name.lower(): count for change_type, count in self.change_counts.items()},
+			"error": self.error,
+			"latency": round(self.latency, 4),
+		}
+
+class DropFolder:
+	"""Pair up marker lists dropped in a folder by reel, and write the changes between versions to an output folder"""
+
+	def __init__(self, path_input:typing.Union[str,pathlib.Path], path_output:typing.Union[str,pathlib.Path], path_log:typing.Optional[typing.Union[str,pathlib.Path]]=None, max_reels:int=DEFAULT_MAX_REELS, max_workers:typing.Optional[int]=None, shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, file_pattern:str=DEFAULT_FILE_PATTERN):
+
+		self._path_input = pathlib.Path(path_input).resolve()
+		self._path_output = pathlib.Path(path_output)
+		self._path_log = pathlib.Path(path_log) if path_log else self._path_output / DEFAULT_LOG_NAME
+		self._file_pattern = file_pattern
+
+		# Resolve the pattern here, since worker processes may not share this process's registry
+		self._shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+		self._marker_filter = marker_filter
+
+		# Latest (version, path) of every reel seen, and the parsed lists of the most recently used reels
+		self._latest:dict[str, typing.Tuple[typing.Optional[int], pathlib.Path]] = {}
+		self._markers = LRUCache(max_reels)
+		self._hashes:dict[pathlib.Path, str] = {}
+
+		self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+
+		self._path_output.mkdir(parents=True, exist_ok=True)
+		self._scan_existing()
+
+	def _is_marker_list(self, path:pathlib.Path) -> bool:
+
+		# Change lists (and maybe the log) are written alongside the marker lists if the output folder is the input folder
+		if path == self._path_log.resolve() or (self._path_output.resolve() == self._path_input and PAT_CHANGE_LIST.match(path.stem)):
+			return False
+
+		return path.parent == self._path_input and path.match(self._file_pattern) and path.is_file()
+
+	@staticmethod
+	def _mtime(path:pathlib.Path) -> typing.Optional[float]:
+		"""A file's modification time, or `None` if it's already gone"""
+		try:
+			return os.stat(path).st_mtime
+		except OSError:
+			return None
+
+	def _scan_existing(self) -> None:
+		"""Remember the latest version of each reel already in the folder, without comparing anything"""
+
+		mtimes = {path: self._mtime(path) for path in self._path_input.glob(self._file_pattern) if self._is_marker_list(path.resolve())}
+
+		for path in sorted((p for p in mtimes if mtimes[p] is not None), key=mtimes.get):
+			reel, version = reel_from_path(path)
+			if self._is_newer(reel, version):
+				self._latest[reel] = (version, path.resolve())
+
+	def _is_newer(self, reel:str, version:typing.Optional[int]) -> bool:
+		"""Whether a version would replace the latest version of a reel (unversioned files always do)"""
+
+		previous = self._latest.get(reel)
+		return previous is None or version is None or previous[0] is None or version >= previous[0]
+
+	def _previous_markers(self, reel:str, path_previous:pathlib.Path) -> typing.List[locatorator.Marker]:
+		"""The parsed previous version of a reel, from the cache if it's still there"""
+
+		cached = self._markers.get(reel)
+		if cached is not None and cached[0] == path_previous:
+			return cached[1]
+
+		return locatorator.get_marker_list_from_path(path_previous, self._shot_id_pattern, self._marker_filter)
+
+	def ingest(self, paths:typing.Iterable[typing.Union[str,pathlib.Path]], noticed:typing.Optional[float]=None) -> typing.List[IngestResult]:
+		"""Compare newly dropped marker lists against the previous versions of their reels, timing them from `noticed` (`time.monotonic()`) if given"""
+
+		started = noticed if noticed is not None else time.monotonic()
+
+		paths = [pathlib.Path(p).resolve() for p in paths]
+		paths = [p for p in paths if self._is_marker_list(p)]
+
+		# Skip files which were only touched (or have gone again)
+		hashes, mtimes = {}, {}
+		for path in paths:
+			try:
+				mtimes[path] = os.stat(path).st_mtime
+				hashes[path] = content_hash(path.read_bytes())
+			except OSError:
+				continue
+		paths = [p for p in hashes if self._hashes.get(p) != hashes[p]]
+
+		# Parse the whole burst at once, then go through each reel's versions in order
+		futures = {path: self._executor.submit(locatorator.get_marker_list_from_path, path, self._shot_id_pattern, self._marker_filter) for path in paths}
+		paths.sort(key=lambda p: (reel_from_path(p)[0], reel_from_path(p)[1] or 0, mtimes[p]))
+
+		results = []
+		for path in paths:
+			reel, version = reel_from_path(path)
+			result = IngestResult(path=path, reel=reel, version=version)
+
+			try:
+				markers_new = futures[path].result()
+			except Exception as e:
+				result.error = str(locatorator.MarkerListLoadError("New", e))
+				results.append(self._finish(result, started))
+				continue
+
+			self._hashes[path] = hashes[path]
+
+			if not self._is_newer(reel, version):
+				result.error = f"An older version than {self._latest[reel][1].name}"
+				results.append(self._finish(result, started))
+				continue
+
+			previous = self._latest.get(reel)
+			self._latest[reel] = (version, path)
+
+			# A re-export to the same file name can only be compared while its last contents are cached
+			if previous and (previous[1] != path or (self._markers.get(reel) or (None,))[0] == path):
+				result.path_previous = previous[1]
+				try:
+					markers_old = self._previous_markers(reel, previous[1])
+					markers_changes = locatorator.build_marker_changes(markers_old, markers_new, self._shot_id_pattern)
+
+					result.path_output = self._path_output / f"{previous[1].stem.strip()} vs {path.stem}.txt"
+					with open(result.path_output, "w") as file_output:
+						locatorator.write_change_list(markers_changes, file_output, shot_id_pattern=self._shot_id_pattern)
+					result.change_counts = dict(markers_changes.summary.change_counts)
+
+				except Exception as e:
+					result.error = str(e)
+			
+			elif previous:
+				result.error = "Re-exported under the same name after its previous contents left the cache, so there was nothing to compare it against"
+
+			self._markers.put(reel, (path, markers_new))
+			results.append(self._finish(result, started))
+
+		return results
+
+	def _finish(self, result:IngestResult, started:float) -> IngestResult:
+		"""Time a result and add it to the log"""
+
+		result.latency = time.monotonic() - started
+
+		with open(self._path_log, "a") as file_log:
+			print(json.dumps(result.to_dict()), file=file_log)
+
+		return result
+
+	def run(self, debounce:float=watch.DEFAULT_DEBOUNCE, poll_interval:float=watch.DEFAULT_POLL_INTERVAL, stop:typing.Optional[threading.Event]=None, report:typing.Callable[[str], None]=print) -> None:
+		"""Ingest marker lists as they're dropped in the folder, until `stop` is set"""
+
+		for changed, noticed in watch.watch_paths((), debounce, poll_interval, stop, folders=[self._path_input], timed=True):
+			for result in self.ingest(changed, noticed):
+				if result.error:
+					report(f"{result.path.name}: {result.error}")
+				elif result.path_output:
+					report(f"{result.path.name}: Changes since {result.path_previous.name} output to {result.path_output}")
+				else:
+					report(f"{result.path.name}: First version of reel {result.reel}")
+
+	def close(self) -> None:
+		"""Shut down the worker pool"""
+		self._executor.shutdown(cancel_futures=True)
+
+	def __enter__(self) -> "DropFolder":
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
@@ -0,0 +1,108 @@
+"""Pair up near-identical shot IDs (Ex: renamed or mistyped) which didn't match exactly"""
+
+import typing, collections
+
+DEFAULT_MIN_CONFIDENCE = 0.6
+"""Least similar a pair of shot IDs can be and still be matched"""
+
+NGRAM_SIZE = 3
+"""Characters per n-gram in the shot ID index"""
+
+MAX_CANDIDATES = 8
+"""Most shot IDs checked with an edit distance for each unmatched shot ID"""
+
+COMMON_NGRAM_SHARE = 20
+"""N-grams found in more than 1 in this many shot IDs (Ex: a show prefix) are too common to find candidates with"""
+
+def _ngrams(text:str, size:int=NGRAM_SIZE) -> typing.Counter[str]:
+	"""Character n-grams of a shot ID (counting repeats), with its start and end marked"""
+
+	text = f"^{text.lower()}$"
+	return collections.Counter(text[idx:idx+size] for idx in range(max(len(text) - size + 1, 1)))
+
+def edit_distance(a:str, b:str, max_distance:typing.Optional[int]=None) -> int:
+	"""Levenshtein distance between two strings, or `max_distance + 1` as soon as it's known to be further"""
+
+	if len(a) < len(b):
+		a, b = b, a
+
+	limit = len(a) if max_distance is None else max_distance
+	if len(a) - len(b) > limit:
+		return limit + 1
+
+	previous = list(range(len(b) + 1))
+
+	for idx_a, char_a in enumerate(a, start=1):
+		current = [idx_a]
+		for idx_b, char_b in enumerate(b, start=1):
+			current.append(min(previous[idx_b] + 1, current[idx_b-1] + 1, previous[idx_b-1] + (char_a != char_b)))
+
+		if min(current) > limit:
+			return limit + 1
+		previous = current
+
+	return min(previous[-1], limit + 1)
+
+def confidence(a:str, b:str, distance:int) -> float:
+	"""How alike two shot IDs are, from 0 to 1"""
+	return 1 - distance / max(len(a), len(b), 1)
+
+def find_fuzzy_matches(ids_old:typing.Iterable[str], ids_new:typing.Iterable[str], min_confidence:float=DEFAULT_MIN_CONFIDENCE) -> typing.List[typing.Tuple[str, str, float]]:
+	"""Pair old and new shot IDs which are alike, as (old ID, new ID, confidence), best matches first
+
+	Each shot ID is used at most once.  Candidates come from an inverted index of n-grams, and only the few sharing
+	the most n-grams (and enough of them to be within `min_confidence`) are checked with an edit distance.
+	"""
+
+	ids_old = list(ids_old)
+	ids_new = list(ids_new)
+
+	# Inverted index of n-gram -> old IDs containing it
+	grams_old = [_ngrams(vfx_id) for vfx_id in ids_old]
+	counts_old = [sum(grams.values()) for grams in grams_old]
+	index:dict[str, typing.List[int]] = collections.defaultdict(list)
+	for idx_old, grams in enumerate(grams_old):
+		for gram in grams:
+			index[gram].append(idx_old)
+
+	candidates = []
+	common = max(MAX_CANDIDATES, len(ids_old) // COMMON_NGRAM_SHARE)
+
+	for vfx_id_new in ids_new:
+
+		grams_new = _ngrams(vfx_id_new)
+		count_new = sum(grams_new.values())
+		postings = [index[gram] for gram in grams_new if gram in index]
+
+		# Old IDs sharing the most distinctive n-grams are the likeliest matches
+		shared = collections.Counter()
+		for posting in [p for p in postings if len(p) <= common] or postings:
+			shared.update(posting)
+
+		for idx_old, _ in shared.most_common(MAX_CANDIDATES):
+
+			vfx_id_old = ids_old[idx_old]
+			max_distance = int((1 - min_confidence) * max(len(vfx_id_old), len(vfx_id_new)) + 1e-9)
+
+			# Each edit can only change so many n-grams (counting repeats, or IDs like "AAA1000" could be ruled out wrongly)
+			if sum((grams_old[idx_old] & grams_new).values()) < max(counts_old[idx_old], count_new) - NGRAM_SIZE * max_distance:
+				continue
+
+			distance = edit_distance(vfx_id_old.lower(), vfx_id_new.lower(), max_distance)
+			if distance > max_distance:
+				continue
+
+			candidates.append((confidence(vfx_id_old, vfx_id_new, distance), vfx_id_old, vfx_id_new))
+
+	# Best matches get first pick
+	matches = []
+	used_old, used_new = set(), set()
+
+	for score, vfx_id_old, vfx_id_new in sorted(candidates, key=lambda x: -x[0]):
+		if score < min_confidence or vfx_id_old in used_old or vfx_id_new in used_new:
+			continue
+		used_old.add(vfx_id_old)
+		used_new.add(vfx_id_new)
+		matches.append((vfx_id_old, vfx_id_new, score))
+
+	return matches
@@ -1,13 +1,15 @@
 from PySide6 import QtWidgets, QtCore, QtGui
-import sys, pathlib, typing
+import sys, re, os, json, pathlib, typing
 import locatorator
-from locatorator import PAT_VFX_MARKER
+from locatorator.timecodes import format_timecode
+from locatorator.cache import ComparisonCache, content_hash
 
 MARKER_COMMENT_COLUMN_NAME = "Shot ID"
 EXPORT_TRACK_OPTIONS = ("TC1","V1","V2","V3","V4","V5","V6","V7","V8")
 EXPORT_DEFAULT_MARKER_NAME = "Locatorator"
 EXPORT_DEFAULT_MARKER_COLOR = "white"
 DEFAULT_MARKER_COLOR = "red"
+MAX_RECENT_COMPARISONS = 8
 
 class MarkerIcons:
 
@@ -56,49 +58,51 @@ class MarkerViewer(QtWidgets.QTreeWidget):
 		self.setUniformRowHeights(True)
 		self.setSortingEnabled(True)
 
-	def set_changelist(self, markers_changes:typing.Iterable[locatorator.MarkerChangeReport]) -> None:
+	def set_changelist(self, markers_changes:typing.Iterable[locatorator.MarkerChange], shot_id_pattern:typing.Optional[re.Pattern]=None) -> None:
 
 		self.clear()
 
+		shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+
 		changelist = []
 
 		font_monospace = QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont).family()
 
-		for marker_change in markers_changes:
+		for change_type, marker_old, marker_new, offset_frames in locatorator.change_rows(markers_changes):
 			
-			if marker_change.change_type == locatorator.ChangeTypes.DELETED:
-				marker_comment = marker_change.marker_old.comment
-				marker_color = MarkerIcons.icons.get(marker_change.marker_old.color.name.lower(), DEFAULT_MARKER_COLOR)
-				tc_old = str(marker_change.marker_old.timecode.start)
+			if change_type == locatorator.ChangeTypes.DELETED:
+				marker_comment = marker_old.comment
+				marker_color = MarkerIcons.icons.get(marker_old.color.name.lower(), DEFAULT_MARKER_COLOR)
+				tc_old = format_timecode(marker_old.start_frame, marker_old.rate, marker_old.drop_frame)
 				tc_new = ""
 				change = "Shot Removed"
 			
-			elif marker_change.change_type == locatorator.ChangeTypes.ADDED:
-				marker_comment = marker_change.marker_new.comment
-				marker_color = MarkerIcons.icons.get(marker_change.marker_new.color.name.lower(), DEFAULT_MARKER_COLOR)
+			elif change_type == locatorator.ChangeTypes.ADDED:
+				marker_comment = marker_new.comment
+				marker_color = MarkerIcons.icons.get(marker_new.color.name.lower(), DEFAULT_MARKER_COLOR)
 				tc_old = ""
-				tc_new = str(marker_change.marker_new.timecode.start)
+				tc_new = format_timecode(marker_new.start_frame, marker_new.rate, marker_new.drop_frame)
 				change = "Shot Added"
 
 			else:
-				marker_comment = marker_change.marker_old.comment
-				marker_color = MarkerIcons.icons.get(marker_change.marker_new.color.name.lower(), DEFAULT_MARKER_COLOR)
-				tc_old = str(marker_change.marker_old.timecode.start)
-				tc_new = str(marker_change.marker_new.timecode.start)
-				change = str(marker_change.relative_offset)
+				marker_comment = marker_old.comment
+				marker_color = MarkerIcons.icons.get(marker_new.color.name.lower(), DEFAULT_MARKER_COLOR)
+				tc_old = format_timecode(marker_old.start_frame, marker_old.rate, marker_old.drop_frame)
+				tc_new = format_timecode(marker_new.start_frame, marker_new.rate, marker_new.drop_frame)
+				change = format_timecode(offset_frames, marker_new.rate)
 				# Add signed positive TC
-				if marker_change.relative_offset > 0:
+				if offset_frames > 0:
 					change = "+" + change
 			
 			
 			changelist_item = QtWidgets.QTreeWidgetItem([
-				PAT_VFX_MARKER.match(marker_comment).group(),
+				locatorator.vfx_id_from_marker(marker_new or marker_old, shot_id_pattern),
 				#marker_comment,
 				tc_old,
 				tc_new,
 				change,
-				str(marker_change.change_type.value)
-			], marker_change.change_type.value)
+				str(change_type.value)
+			], change_type.value)
 
 			changelist_item.setFont(1, font_monospace)
 			changelist_item.setFont(2, font_monospace)
@@ -110,7 +114,7 @@ class MarkerViewer(QtWidgets.QTreeWidget):
 			
 			# Set marker icon according to the color in the marker list
 			changelist_item.setIcon(0, marker_color)
-			if marker_change.change_type == locatorator.ChangeTypes.UNCHANGED:
+			if change_type == locatorator.ChangeTypes.UNCHANGED:
 				for col in range(len(self._headerlabels)):
 					changelist_item.setForeground(col, QtGui.QColor(QtCore.Qt.GlobalColor.gray)
 				)
@@ -304,6 +308,8 @@ class InputListGroup(QtWidgets.QGroupBox):
 		self._layout = QtWidgets.QVBoxLayout()
 		self._input_old_markers = InputFileChooser(label="Old Markers:")
 		self._input_new_markers = InputFileChooser(label="New Markers:")
+		self._txt_window_start = QtWidgets.QLineEdit()
+		self._txt_window_end = QtWidgets.QLineEdit()
 		self._btn_compare = QtWidgets.QPushButton()
 
 		self._settings = QtCore.QSettings()
@@ -320,6 +326,23 @@ class InputListGroup(QtWidgets.QGroupBox):
 		self.layout().addWidget(self._input_old_markers)
 		self.layout().addWidget(self._input_new_markers)
 
+		# Optional timecode window to limit the comparison to (Ex: one reel)
+		self._txt_window_start.setPlaceholderText("Start of sequence")
+		self._txt_window_end.setPlaceholderText("End of sequence")
+		self._txt_window_start.setClearButtonEnabled(True)
+		self._txt_window_end.setClearButtonEnabled(True)
+
+		# Only timecodes (Ex: 01:00:00:00, 01:00:00;00, 10:00) or frame counts can be typed in
+		for txt_window in (self._txt_window_start, self._txt_window_end):
+			txt_window.setValidator(QtGui.QRegularExpressionValidator(QtCore.QRegularExpression(r"^\d+([:;]\d{1,2}){0,3}$"), txt_window))
+
+		layout_window = QtWidgets.QHBoxLayout()
+		layout_window.addWidget(QtWidgets.QLabel("Only Shots From:"))
+		layout_window.addWidget(self._txt_window_start)
+		layout_window.addWidget(QtWidgets.QLabel("To:"))
+		layout_window.addWidget(self._txt_window_end)
+		self.layout().addLayout(layout_window)
+
 		self._btn_compare.setText("Compare Marker Lists")
 		self._btn_compare.setDefault(True)
 		self._btn_compare.setEnabled(False)
@@ -334,6 +357,15 @@ class InputListGroup(QtWidgets.QGroupBox):
 	def get_specified_paths(self) -> typing.Tuple[str,str]:
 		"""Get the paths currently chosen"""
 		return (self._input_old_markers.get_specified_path(), self._input_new_markers.get_specified_path())
+	
+	def get_window(self) -> typing.Tuple[typing.Optional[str],typing.Optional[str]]:
+		"""Get the start and end timecodes to compare between (`None` for either end of the sequence)"""
+		return (self._txt_window_start.text().strip() or None, self._txt_window_end.text().strip() or None)
+	
+	def set_specified_paths(self, path_old:str, path_new:str):
+		"""Choose the old and new paths"""
+		self._input_old_markers.set_specified_path(path_old)
+		self._input_new_markers.set_specified_path(path_new)
 
 	
 	def _paths_changed(self):
@@ -370,13 +402,15 @@ class MainWidget(QtWidgets.QWidget):
 		self._path_old = pathlib.Path()
 		self._path_new = pathlib.Path()
 
-		self._markerlist = []
+		self._markerlist = locatorator.ChangeSet([], [])
+		self._comparisons = ComparisonCache()
 
 		self._settings = QtCore.QSettings()
 
 		self._setup()
 	
 	def _setup(self):
+		self._load_shot_id_patterns()
 		self.setLayout(self._layout)
 		self.layout().addWidget(self._grp_list_inputs)
 		
@@ -405,7 +439,7 @@ class MainWidget(QtWidgets.QWidget):
 		
 		# Export list will only contain changes or additions (no unchanged or deletions)
 		self._exporter.allow_export(
-			any(m.change_type in (locatorator.ChangeTypes.CHANGED, locatorator.ChangeTypes.ADDED) for m in self._markerlist)
+			self._markerlist.summary.has_changes
 		)
 
 		self._tree_viewer.setFilters(self._filters.enabledFilters())
@@ -429,7 +463,8 @@ class MainWidget(QtWidgets.QWidget):
 					marker_name=marker_name,
 					marker_track=marker_track,
 					marker_color=marker_color,
-					change_types=self._filters.enabledFilters()
+					change_types=self._filters.enabledFilters(),
+					shot_id_pattern=self.shot_id_pattern()
 				)
 
 		except Exception as e:
@@ -455,41 +490,166 @@ class MainWidget(QtWidgets.QWidget):
 		# TODO: Split this out?
 
 		# Clear out the marker list model
-		self._markerlist = []
+		self._markerlist = locatorator.ChangeSet([], [])
 		self._tree_viewer.clear()
 
 
+		self._path_old = pathlib.Path(path_old)
+		self._path_new = pathlib.Path(path_new)
+
+		# Load both lists at once, unless they've been compared already
 		try:
-			self._path_old = pathlib.Path(path_old)
-			with self._path_old.open() as file_old:
-				markers_old = locatorator.get_marker_list_from_file(file_old)
-		except Exception as e:
+			shot_id_pattern = self.shot_id_pattern()
+			window = self._grp_list_inputs.get_window()
+
+			fuzzy_min_confidence = self.fuzzy_min_confidence()
+
+			# Recent comparisons are saved for whole sequences only
+			self._markerlist = (not any(window) and self._restore_comparison(shot_id_pattern, fuzzy_min_confidence)) or self._comparisons.compare(self._path_old, self._path_new, shot_id_pattern, window_start=window[0], window_end=window[1], fuzzy_min_confidence=fuzzy_min_confidence)
+			self._tree_viewer.set_changelist(self._markerlist, shot_id_pattern)
+		except locatorator.MarkerListLoadError as e:
 			self.sig_changes_failed.emit()
-			QtWidgets.QMessageBox.critical(self, "Error Loading Marker List",f"<strong>Cannot load the &quot;Old&quot; marker list:</strong><br/>{e}")
+			QtWidgets.QMessageBox.critical(self, "Error Loading Marker List",f"<strong>Cannot load the &quot;{e.side}&quot; marker list:</strong><br/>{e.error}")
 			self.sig_changes_failed.emit()
 			return
-
-		try:
-			self._path_new = pathlib.Path(path_new)
-			with self._path_new.open() as file_new:
-				markers_new = locatorator.get_marker_list_from_file(file_new)
-		except Exception as e:
+		except locatorator.TimecodeWindowError as e:
 			self.sig_changes_failed.emit()
-			QtWidgets.QMessageBox.critical(self, "Error Loading Marker List",f"<strong>Cannot load the &quot;New&quot; marker list:</strong><br/>{e}")
+			QtWidgets.QMessageBox.warning(self, "Invalid Timecode Window",f"<strong>Cannot compare only the shots from {window[0] or 'the start'} to {window[1] or 'the end'}:</strong><br/>{e}")
 			self.sig_changes_failed.emit()
 			return
-				
-		try:
-			self._markerlist = locatorator.build_marker_changes(markers_old, markers_new)
-			self._tree_viewer.set_changelist(self._markerlist)
 		except Exception as e:
 			self.sig_changes_failed.emit()
 			QtWidgets.QMessageBox.critical(self, "Error Comparing Changes",f"<strong>Cannot compare marker lists:</strong><br/>{e}")
 			self.sig_changes_failed.emit()
 			return
 
+		if not any(window):
+			self._remember_comparison(shot_id_pattern, fuzzy_min_confidence)
 		self.sig_changes_ready.emit()
 	
+	def recent_comparisons(self) -> typing.List[dict]:
+		"""Recently compared marker lists, most recent first"""
+
+		try:
+			return list(json.loads(str(self._settings.value("recent/comparisons", "[]"))))
+		except Exception:
+			return []
+	
+	def open_recent_comparison(self, path_old:str, path_new:str):
+		"""Compare a recent pair of marker lists again"""
+
+		self._grp_list_inputs.set_specified_paths(path_old, path_new)
+		self._set_paths(path_old, path_new)
+	
+	def clear_recent_comparisons(self):
+		"""Forget all recent comparisons"""
+
+		self._settings.remove("recent")
+	
+	@staticmethod
+	def _recent_comparison_key(path_old:pathlib.Path, path_new:pathlib.Path) -> str:
+		return content_hash(f"{path_old.resolve()}\t{path_new.resolve()}".encode("utf-8"))[:16]
+
+	def _restore_comparison(self, shot_id_pattern:re.Pattern, fuzzy_min_confidence:typing.Optional[float]=None) -> typing.Optional[locatorator.ChangeSet]:
+		"""Restore the saved changes for the current paths, if neither marker list (nor how they're matched) has changed since"""
+
+		key = self._recent_comparison_key(self._path_old, self._path_new)
+		recent = next((r for r in self.recent_comparisons() if r.get("key") == key), None)
+
+		if not recent or recent.get("pattern") != shot_id_pattern.pattern or recent.get("fuzzy") != fuzzy_min_confidence:
+			return None
+
+		try:
+			for path, (mtime, size, file_hash) in zip((self._path_old, self._path_new), recent["files"]):
+				stat = os.stat(path)
+				# A touched file might still have the same contents
+				if (stat.st_mtime_ns, stat.st_size) != (mtime, size) and content_hash(path.read_bytes()) != file_hash:
+					return None
+
+			return locatorator.ChangeSet.from_bytes(bytes(self._settings.value(f"recent/changes/{key}")))
+
+		except Exception:
+			# Anything amiss with the saved comparison (Ex: from an older version) just means comparing again
+			return None
+
+	def _remember_comparison(self, shot_id_pattern:re.Pattern, fuzzy_min_confidence:typing.Optional[float]=None):
+		"""Save the current changes as the most recent comparison"""
+
+		key = self._recent_comparison_key(self._path_old, self._path_new)
+
+		try:
+			recent = {
+				"key":     key,
+				"old":     str(self._path_old),
+				"new":     str(self._path_new),
+				"pattern": shot_id_pattern.pattern,
+				"fuzzy":   fuzzy_min_confidence,
+				"files":   [self._comparisons.file_signature(p) for p in (self._path_old, self._path_new)],
+			}
+		except Exception:
+			# The comparison is on screen either way; it just won't be in the recent list (Ex: a file has since gone)
+			return
+
+		recents = [recent] + [r for r in self.recent_comparisons() if r.get("key") != key]
+
+		for expired in recents[MAX_RECENT_COMPARISONS:]:
+			self._settings.remove(f"recent/changes/{expired.get('key')}")
+
+		self._settings.setValue(f"recent/changes/{key}", QtCore.QByteArray(self._markerlist.to_bytes()))
+		self._settings.setValue("recent/comparisons", json.dumps(recents[:MAX_RECENT_COMPARISONS]))
+	
+	def _load_shot_id_patterns(self):
+		"""Register any shot ID patterns from the patterns file chosen previously"""
+
+		path_patterns = str(self._settings.value("shotids/patternspath", ""))
+		if not path_patterns:
+			return
+
+		try:
+			self.load_shot_id_patterns(path_patterns)
+		except Exception as e:
+			QtWidgets.QMessageBox.warning(self, "Error Loading Shot ID Patterns", f"<strong>Cannot load shot ID patterns from {path_patterns}:</strong><br/>{e}")
+
+	def load_shot_id_patterns(self, path_patterns:str):
+		"""Register shot ID patterns from a file, and remember it for next time"""
+
+		with open(path_patterns) as file_patterns:
+			locatorator.load_shot_id_patterns(file_patterns)
+
+		self._settings.setValue("shotids/patternspath", path_patterns)
+
+	def enabled_shot_id_patterns(self) -> typing.List[str]:
+		"""Names of the shot ID patterns chosen for matching (all patterns if empty)"""
+		return [name for name in self._settings.value("shotids/enabled", [], list) if name in locatorator.ShotIdPatterns]
+
+	def set_shot_id_pattern_enabled(self, name:str, enabled:bool):
+		"""Choose whether a shot ID pattern is used for matching"""
+
+		# No choice saved yet means all patterns are in use
+		names = [n for n in (self.enabled_shot_id_patterns() or locatorator.ShotIdPatterns) if n != name]
+		if enabled:
+			names.append(name)
+
+		self._settings.setValue("shotids/enabled", names)
+
+	def shot_id_pattern(self) -> re.Pattern:
+		"""The compiled shot ID pattern currently chosen"""
+		return locatorator.get_shot_id_pattern(self.enabled_shot_id_patterns() or None)
+
+	def fuzzy_matching_enabled(self) -> bool:
+		"""Whether renamed or mistyped shot IDs are paired up"""
+		return self._settings.value("compare/fuzzy", False, bool)
+
+	def set_fuzzy_matching_enabled(self, enabled:bool):
+		"""Choose whether renamed or mistyped shot IDs are paired up"""
+		self._settings.setValue("compare/fuzzy", enabled)
+
+	def fuzzy_min_confidence(self) -> typing.Optional[float]:
+		"""How alike shot IDs must be to be paired up, or `None` if they must match exactly"""
+
+		from locatorator import fuzzy
+		return fuzzy.DEFAULT_MIN_CONFIDENCE if self.fuzzy_matching_enabled() else None
+
 	def _prep_marker_icons(self):
 		"""Prepare marker icons based on Marker Colors"""
 		for marker_color in (m.lower() for m in locatorator.MarkerColors._member_names_):
@@ -600,10 +760,73 @@ class MainWindow(QtWidgets.QMainWindow):
 		self.setWindowTitle("Locatorator")
 		self.setMinimumWidth(500)
 
+		self.menu_recent = QtWidgets.QMenu("&Recent Comparisons")
+		self.menu_recent.aboutToShow.connect(self._populate_recent_menu)
+
+		self.menu_shot_ids = QtWidgets.QMenu("&Shot IDs")
+		self.menu_shot_ids.aboutToShow.connect(self._populate_shot_id_menu)
+
 		menu_help = QtWidgets.QMenu("&Help")
 		menu_help.addAction("About", self.wnd_about.exec)
 
+		self.menuBar().addMenu(self.menu_recent)
+		self.menuBar().addMenu(self.menu_shot_ids)
 		self.menuBar().addMenu(menu_help)
+	
+	@QtCore.Slot()
+	def _populate_recent_menu(self) -> None:
+		"""List the recent comparisons"""
+
+		self.menu_recent.clear()
+		recents = self.wdg_main.recent_comparisons()
+
+		for recent in recents:
+			action = self.menu_recent.addAction(f"{pathlib.Path(recent['old']).name} vs {pathlib.Path(recent['new']).name}")
+			action.setToolTip(f"{recent['old']}\n{recent['new']}")
+			action.triggered.connect(lambda checked=False, recent=recent: self.wdg_main.open_recent_comparison(recent["old"], recent["new"]))
+
+		if not recents:
+			self.menu_recent.addAction("No Recent Comparisons").setEnabled(False)
+
+		self.menu_recent.addSeparator()
+		self.menu_recent.addAction("Clear Recent Comparisons", self.wdg_main.clear_recent_comparisons).setEnabled(bool(recents))
+	
+	@QtCore.Slot()
+	def _populate_shot_id_menu(self) -> None:
+		"""List the registered shot ID patterns"""
+
+		self.menu_shot_ids.clear()
+		enabled = self.wdg_main.enabled_shot_id_patterns()
+
+		for name, pattern in locatorator.ShotIdPatterns.items():
+			action = self.menu_shot_ids.addAction(name)
+			action.setToolTip(pattern)
+			action.setCheckable(True)
+			action.setChecked(not enabled or name in enabled)
+			action.toggled.connect(lambda checked, name=name: self.wdg_main.set_shot_id_pattern_enabled(name, checked))
+
+		self.menu_shot_ids.addSeparator()
+		action_fuzzy = self.menu_shot_ids.addAction("Match Renamed Shots")
+		action_fuzzy.setToolTip("Also pair up shot IDs which are alike (Ex: renamed or mistyped)")
+		action_fuzzy.setCheckable(True)
+		action_fuzzy.setChecked(self.wdg_main.fuzzy_matching_enabled())
+		action_fuzzy.toggled.connect(self.wdg_main.set_fuzzy_matching_enabled)
+
+		self.menu_shot_ids.addSeparator()
+		self.menu_shot_ids.addAction("Load Shot ID Patterns...", self._choose_shot_id_patterns)
+	
+	@QtCore.Slot()
+	def _choose_shot_id_patterns(self) -> None:
+		"""Browse for a shot ID patterns file"""
+
+		path_patterns = QtWidgets.QFileDialog.getOpenFileName(self, "Choose a shot ID patterns file...", "", "Text Files (*.txt);;All Files (*)")[0]
+		if not path_patterns:
+			return
+
+		try:
+			self.wdg_main.load_shot_id_patterns(path_patterns)
+		except Exception as e:
+			QtWidgets.QMessageBox.critical(self, "Error Loading Shot ID Patterns", f"<strong>Cannot load shot ID patterns:</strong><br/>{e}")
 
 def main() -> int:
 	"""Launch the QApplication"""
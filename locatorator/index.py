@@ -0,0 +1,93 @@
+"""Timecode lookups over a marker list: point, range and nearest-marker queries"""
+
+import typing, bisect
+import locatorator
+from locatorator.timecodes import to_frame_number
+
+class MarkerIndex:
+	"""A marker list indexed by start frame, with an interval tree over spanned markers' durations"""
+
+	def __init__(self, markers:typing.Iterable[locatorator.Marker]):
+
+		self._markers = sorted(markers, key=lambda x:x.start_frame)
+		self._starts  = [m.start_frame for m in self._markers]
+		self._ends    = [m.start_frame + max(m.duration_frames, 1) for m in self._markers]
+
+		# Implicit balanced tree over the sorted list: each node is the middle of its range, and
+		# holds the latest end frame of any marker in that range
+		self._max_ends = [0] * len(self._markers)
+		self._build(0, len(self._markers))
+
+	def _build(self, lo:int, hi:int) -> int:
+
+		if lo >= hi:
+			return -1
+
+		mid = (lo + hi) // 2
+		self._max_ends[mid] = max(self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+		return self._max_ends[mid]
+
+	def _overlapping(self, lo:int, hi:int, start:int, end:int, found:typing.List[int]) -> None:
+
+		if lo >= hi:
+			return
+
+		mid = (lo + hi) // 2
+
+		# Nothing in this range lasts until the start
+		if self._max_ends[mid] <= start:
+			return
+
+		self._overlapping(lo, mid, start, end, found)
+
+		# Everything from here on starts too late
+		if self._starts[mid] >= end:
+			return
+
+		if self._ends[mid] > start:
+			found.append(mid)
+
+		self._overlapping(mid + 1, hi, start, end, found)
+
+	@property
+	def markers(self) -> typing.List[locatorator.Marker]:
+		"""The markers, sorted by start frame"""
+		return self._markers
+
+	def overlapping(self, start:typing.Union[int,str,typing.Any], end:typing.Union[int,str,typing.Any]) -> typing.List[locatorator.Marker]:
+		"""Markers whose span overlaps the range from `start` up to (not including) `end`, in timecode order"""
+
+		found = []
+		self._overlapping(0, len(self._markers), to_frame_number(start), to_frame_number(end), found)
+		return [self._markers[idx] for idx in found]
+
+	def at(self, timecode:typing.Union[int,str,typing.Any]) -> typing.List[locatorator.Marker]:
+		"""Markers whose span includes a timecode"""
+
+		frame = to_frame_number(timecode)
+		return self.overlapping(frame, frame + 1)
+
+	def starting_between(self, start:typing.Union[int,str,typing.Any], end:typing.Union[int,str,typing.Any]) -> typing.List[locatorator.Marker]:
+		"""Markers which start from `start` up to (not including) `end`"""
+		return self._markers[bisect.bisect_left(self._starts, to_frame_number(start)):bisect.bisect_left(self._starts, to_frame_number(end))]
+
+	def nearest(self, timecode:typing.Union[int,str,typing.Any]) -> typing.Optional[locatorator.Marker]:
+		"""The marker starting closest to a timecode (the earlier one if tied), or `None` if there are no markers"""
+
+		if not self._markers:
+			return None
+
+		frame = to_frame_number(timecode)
+		idx = bisect.bisect_left(self._starts, frame)
+
+		if idx == len(self._starts):
+			return self._markers[-1]
+		if idx and frame - self._starts[idx-1] <= self._starts[idx] - frame:
+			return self._markers[idx-1]
+		return self._markers[idx]
+
+	def __len__(self) -> int:
+		return len(self._markers)
+
+	def __iter__(self) -> typing.Iterator[locatorator.Marker]:
+		return iter(self._markers)
@@ -0,0 +1,53 @@
+"""Combine marker lists from several departments (Ex: VFX, sound, color) into one, in timecode order"""
+
+import typing, re, heapq, pathlib, operator
+import locatorator
+
+def merge_marker_lists(marker_lists:typing.Iterable[typing.Iterable[locatorator.Marker]], dedupe:bool=False) -> typing.Iterator[locatorator.Marker]:
+	"""Merge marker lists which are each sorted by start timecode, in timecode order (markers at the same timecode keep the order of their lists)
+
+	Markers are pulled from each list as they're needed, so the merge itself only holds one marker per list at a time
+	(lists parsed from files hold a batch of up to `locatorator.MARKER_BATCH_SIZE` each, so k·MARKER_BATCH_SIZE for k files).
+	With `dedupe`, markers identical to one already merged at the same timecode are dropped.
+	"""
+
+	# Sort on frame numbers rather than comparing markers, which would copy a timecode every time
+	merged = heapq.merge(*marker_lists, key=operator.attrgetter("start_frame"))
+
+	if not dedupe:
+		yield from merged
+		return
+
+	# Duplicates share a start timecode, so only the markers at the current one need remembering
+	current_frame, seen = None, set()
+
+	for marker in merged:
+
+		if marker.start_frame != current_frame:
+			current_frame, seen = marker.start_frame, set()
+
+		if marker.fingerprint in seen:
+			continue
+		seen.add(marker.fingerprint)
+
+		yield marker
+
+def iter_marker_list_from_path(path_input:typing.Union[str,pathlib.Path], marker_filter:typing.Optional[locatorator.MarkerFilter]=None, shot_id_pattern:typing.Optional[re.Pattern]=None, require_shot_id:bool=False, rate:typing.Optional[int]=None) -> typing.Iterator[locatorator.Marker]:
+	"""Parse markers a batch of lines at a time from a sorted marker list file (at `rate`, or the rate detected from its first lines), naming the file in any error"""
+
+	try:
+		with open(path_input, "rb") as file_input:
+			yield from locatorator.iter_marker_list_from_file(locatorator.iter_marker_lines(file_input), marker_filter, shot_id_pattern, require_shot_id, rate)
+	except Exception as e:
+		raise locatorator.MarkerListLoadError(pathlib.Path(path_input).name, e) from e
+
+def merge_marker_list_paths(paths_input:typing.Iterable[typing.Union[str,pathlib.Path]], file_output:typing.TextIO, dedupe:bool=False, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, shot_id_pattern:typing.Optional[re.Pattern]=None, require_shot_id:bool=False, rate:typing.Optional[int]=None) -> None:
+	"""Merge sorted marker list files into one importable marker list (only markers with shot IDs, if `require_shot_id` is `True`)
+
+	Each file is parsed a batch at a time, so up to `locatorator.MARKER_BATCH_SIZE` markers per file are held in memory.
+	"""
+
+	locatorator.write_marker_list(
+		merge_marker_lists((iter_marker_list_from_path(path, marker_filter, shot_id_pattern, require_shot_id, rate) for path in paths_input), dedupe),
+		file_output
+	)
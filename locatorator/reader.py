@@ -0,0 +1,163 @@
+"""Memory-mapped marker list reader for very large marker lists"""
+
+import typing, re, os, mmap, pathlib, concurrent.futures
+import locatorator
+
+DEFAULT_LEGACY_ENCODING = locatorator.LEGACY_ENCODING
+"""Encoding Avid uses for non-UTF-8 marker lists on this platform"""
+
+BOM_UTF8 = locatorator.BOM_UTF8
+BOMS_UTF16 = locatorator.BOMS_UTF16
+
+BLOCK_SIZE = 1024 * 1024
+"""Bytes of the mapped file to split into lines at a time"""
+
+PARALLEL_READER_THRESHOLD = 64 * 1024 * 1024
+"""Marker lists smaller than this are parsed serially, since starting a process pool would take longer"""
+
+_decode = locatorator.decode_marker_text
+
+def parse_marker_range(buffer:typing.Union[mmap.mmap,bytes], start:int, end:int, first_line:int=1, shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, legacy_encoding:str=DEFAULT_LEGACY_ENCODING, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.List[locatorator.Marker]:
+	"""Parse the markers between two byte offsets of a mapped (or read) marker list, starting on line `first_line`, at `rate` or the rate detected from them"""
+
+	shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+	marker_fields = []
+	line_number = first_line
+
+	for block_start, block_end in _newline_aligned_ranges(buffer, start, end, BLOCK_SIZE):
+
+		# Splitting a block of raw bytes in C is much quicker than scanning each line from Python
+		lines = buffer[block_start:block_end].split(b"\n")
+		if not lines[-1]:
+			lines.pop()
+
+		for line in lines:
+
+			try:
+				fields = line.rstrip(b"\r").split(b"\t")
+				field_count = len(fields)
+
+				if field_count == 8 and fields[5].isdigit() and fields[7].isalpha() and fields[0] and fields[2]:
+					track, color, user = _decode(fields[2], legacy_encoding), fields[7].decode("ascii").lower(), _decode(fields[6], legacy_encoding)
+				elif field_count == 6 and fields[5].isdigit() and fields[3].isalpha() and fields[0] and fields[2]:
+					track, color, user = _decode(fields[2], legacy_encoding), fields[3].decode("ascii").lower(), ""
+				else:
+					# Unusual line (Ex: tabs in the comment): let the text parser sort it out
+					fields = locatorator.Marker.fields_from_string(_decode(line.rstrip(b"\r"), legacy_encoding))
+					track, color, user = fields[2], fields[3], fields[6]
+
+				if marker_filter and not marker_filter.accepts(track=track, color=color, user=user):
+					continue
+
+				# Only decode the comment once the cheap checks have passed
+				comment = fields[4]
+				comment = locatorator.Marker._sanitize_string(_decode(comment, legacy_encoding) if isinstance(comment, bytes) else comment)
+				if require_shot_id and not shot_id_pattern.match(comment):
+					continue
+
+				name, tc_start, duration = (_decode(f, legacy_encoding) if isinstance(f, bytes) else f for f in (fields[0], fields[1], fields[5]))
+				marker_fields.append((line_number, name, tc_start, track, color, comment, duration, user))
+
+			except Exception as e:
+				raise locatorator.MarkerParseError(line_number, e)
+
+			finally:
+				line_number += 1
+
+	return locatorator.markers_from_fields(marker_fields, rate)
+
+def _newline_aligned_ranges(buffer:typing.Union[mmap.mmap,bytes], start:int, end:int, size:int) -> typing.Iterator[typing.Tuple[int,int]]:
+	"""Split a byte range into ranges of roughly `size` bytes, each ending just after a newline"""
+
+	while start < end:
+
+		split = buffer.find(b"\n", min(start + size, end) - 1, end) if start + size < end else -1
+		split = end if split == -1 else split + 1
+
+		yield start, split
+		start = split
+
+def get_marker_list_from_mapped_file(path_input:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, legacy_encoding:str=DEFAULT_LEGACY_ENCODING, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.List[locatorator.Marker]:
+	"""Parse a marker list by memory-mapping it and scanning the raw bytes, sorted by start timecode"""
+
+	with open(path_input, "rb") as file_input:
+
+		if not os.fstat(file_input.fileno()).st_size:
+			return []
+
+		with mmap.mmap(file_input.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+			# UTF-16 can't be scanned for single-byte tabs and newlines
+			if buffer[:2] in BOMS_UTF16:
+				with open(path_input, encoding="utf-16") as file_text:
+					markers = locatorator.get_marker_list_from_file(file_text, shot_id_pattern, marker_filter, require_shot_id, rate)
+
+			else:
+				start = len(BOM_UTF8) if buffer[:len(BOM_UTF8)] == BOM_UTF8 else 0
+				markers = parse_marker_range(buffer, start, len(buffer), 1, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate)
+
+	markers.sort(key=lambda x:x.start_frame)
+	return markers
+
+def _parse_mapped_chunk(path_input:typing.Union[str,pathlib.Path], start:int, end:int, shot_id_pattern:re.Pattern, marker_filter:typing.Optional[locatorator.MarkerFilter], legacy_encoding:str, require_shot_id:bool, rate:typing.Optional[int]) -> typing.List[locatorator.Marker]:
+	"""Parse one byte range of a marker list, numbering lines from the start of the range (runs in a worker)"""
+
+	with open(path_input, "rb") as file_input, mmap.mmap(file_input.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+		return parse_marker_range(buffer, start, end, 1, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate)
+
+def _count_lines(buffer:mmap.mmap, start:int, end:int) -> int:
+	"""Count the newlines in a byte range"""
+	return sum(buffer[a:b].count(b"\n") for a, b in _newline_aligned_ranges(buffer, start, end, BLOCK_SIZE))
+
+def get_marker_list_from_mapped_file_parallel(path_input:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, legacy_encoding:str=DEFAULT_LEGACY_ENCODING, max_workers:typing.Optional[int]=None, threshold:int=PARALLEL_READER_THRESHOLD, require_shot_id:bool=True, rate:typing.Optional[int]=None) -> typing.List[locatorator.Marker]:
+	"""Parse a large marker list in newline-aligned chunks across a process pool, sorted by start timecode, at `rate` or the rate detected from it"""
+
+	shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+	max_workers = max_workers or os.cpu_count() or 1
+	file_size = os.path.getsize(path_input)
+
+	if file_size < threshold or max_workers < 2:
+		return get_marker_list_from_mapped_file(path_input, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate)
+
+	with open(path_input, "rb") as file_input, mmap.mmap(file_input.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+		if buffer[:2] in BOMS_UTF16:
+			return get_marker_list_from_mapped_file(path_input, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate)
+
+		start = len(BOM_UTF8) if buffer[:len(BOM_UTF8)] == BOM_UTF8 else 0
+
+		# A few chunks per worker keeps them all busy if some chunks have more markers than others
+		chunk_size = max(file_size // (max_workers * 4), BLOCK_SIZE)
+		chunks = list(_newline_aligned_ranges(buffer, start, file_size, chunk_size))
+
+		with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+			def parse_chunks(chunks:typing.List[typing.Tuple[int,int]], rate:typing.Optional[int]) -> typing.List[typing.List[locatorator.Marker]]:
+
+				futures = [executor.submit(_parse_mapped_chunk, path_input, chunk_start, chunk_end, shot_id_pattern, marker_filter, legacy_encoding, require_shot_id, rate) for chunk_start, chunk_end in chunks]
+				results = []
+
+				for (chunk_start, _), future in zip(chunks, futures):
+					try:
+						results.append(future.result())
+					except locatorator.MarkerParseError as e:
+						# Report the line number from the start of the file
+						for pending in futures:
+							pending.cancel()
+						raise locatorator.MarkerParseError(_count_lines(buffer, start, chunk_start) + e.line_number, e.error) from None
+				
+				return results
+
+			chunk_markers = parse_chunks(chunks, rate)
+
+			# Each chunk detects its own rate, so any which never reached the highest frame numbers are read again
+			if rate is None:
+				chunk_rate = max((m[0].rate for m in chunk_markers if m), default=None)
+				redo = [idx for idx, m in enumerate(chunk_markers) if m and m[0].rate != chunk_rate]
+				for idx, markers in zip(redo, parse_chunks([chunks[idx] for idx in redo], chunk_rate)):
+					chunk_markers[idx] = markers
+
+	markers = [marker for markers in chunk_markers for marker in markers]
+
+	markers.sort(key=lambda x:x.start_frame)
+	return markers
@@ -0,0 +1,112 @@
+"""Translate timecodes from the old cut to the new cut, using matched shots as anchors"""
+
+import typing, array, bisect
+import locatorator
+from locatorator.timecodes import to_frame_number
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+class TimecodeRemap:
+	"""A piecewise mapping from the old timeline to the new one
+
+	Each breakpoint is the old start frame of a matched shot and how far that shot moved.  A frame in the old cut
+	moves by the same amount as the closest shot starting at or before it (or the first shot, if there is none).
+	"""
+
+	def __init__(self, breakpoints:typing.Iterable[typing.Tuple[int,int]]):
+
+		breakpoints = sorted(breakpoints)
+
+		self._old_frames = array.array("q", (old_frame for old_frame, _ in breakpoints))
+		self._offsets    = array.array("q", (offset for _, offset in breakpoints))
+
+	@classmethod
+	def from_changes(cls, markers_changes:typing.Iterable[typing.Union[locatorator.MarkerChangeReport,locatorator.MarkerChange]]) -> "TimecodeRemap":
+		"""Build a remap from the shots matched between two marker lists"""
+
+		return cls(
+			(marker_old.start_frame, marker_new.start_frame - marker_old.start_frame)
+			for _, marker_old, marker_new, _ in locatorator.change_rows(markers_changes)
+			if marker_old and marker_new
+		)
+
+	@property
+	def breakpoints(self) -> typing.List[typing.Tuple[int,int]]:
+		"""The (old start frame, offset) of each anchor, in timecode order"""
+		return list(zip(self._old_frames, self._offsets))
+
+	def offset_at(self, timecode:typing.Union[int,str,typing.Any]) -> int:
+		"""How many frames a timecode in the old cut moves by in the new cut"""
+
+		if not self._offsets:
+			return 0
+
+		return self._offsets[max(bisect.bisect_right(self._old_frames, to_frame_number(timecode)) - 1, 0)]
+
+	def remap(self, timecode:typing.Union[int,str,typing.Any]) -> int:
+		"""Translate a timecode in the old cut to a frame number in the new cut"""
+
+		frame = to_frame_number(timecode)
+		return frame + self.offset_at(frame)
+
+	def remap_frames(self, frames:typing.Iterable[int]) -> typing.Union[typing.List[int],"numpy.ndarray"]:
+		"""Translate many frame numbers at once (a NumPy array stays a NumPy array)"""
+
+		if numpy is not None and isinstance(frames, numpy.ndarray):
+
+			if not self._offsets:
+				return frames.copy()
+
+			old_frames = numpy.frombuffer(self._old_frames, dtype=numpy.int64)
+			offsets    = numpy.frombuffer(self._offsets, dtype=numpy.int64)
+
+			idx = numpy.maximum(numpy.searchsorted(old_frames, frames, side="right") - 1, 0)
+			return frames + offsets[idx]
+
+		return [self.remap(frame) for frame in frames]
+
+	def __len__(self) -> int:
+		return len(self._offsets)
+
+	def __repr__(self) -> str:
+		return f"<{self.__class__.__name__} breakpoints={len(self)}>"
+
+def carry_over_markers(markers_old:typing.Sequence[locatorator.Marker], timecode_remap:TimecodeRemap) -> typing.Tuple[typing.List[locatorator.Marker], int]:
+	"""Relocate markers from the old cut to their timecodes in the new cut, sorted by start timecode
+
+	Markers which would land before frame 0 are placed at frame 0, since negative timecodes can't be imported.
+	Returns the relocated markers, and how many of them were placed at frame 0 that way.
+	"""
+
+	markers_old = list(markers_old)
+	start_frames = [marker.start_frame for marker in markers_old]
+
+	if numpy is not None:
+		remapped = timecode_remap.remap_frames(numpy.array(start_frames, dtype=numpy.int64))
+		clamped = int(numpy.count_nonzero(remapped < 0))
+		start_frames = numpy.maximum(remapped, 0).tolist()
+	else:
+		remapped = timecode_remap.remap_frames(start_frames)
+		clamped = sum(frame < 0 for frame in remapped)
+		start_frames = [max(frame, 0) for frame in remapped]
+
+	markers_new = [
+		locatorator.Marker(
+			name = marker.name,
+			tc_start = start_frame,
+			track = marker.track,
+			color = marker.color,
+			comment = marker.comment,
+			duration = marker.duration_frames,
+			user = marker.user,
+			rate = marker.rate,
+			drop_frame = marker.drop_frame,
+		)
+		for marker, start_frame in zip(markers_old, start_frames)
+	]
+
+	markers_new.sort(key=lambda x:x.start_frame)
+	return markers_new, clamped
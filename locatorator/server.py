@@ -0,0 +1,222 @@
+"""Long-running local comparison service with an in-memory marker list cache"""
+
+import typing, re, io, json, stat, pathlib, socket, socketserver, http.server, http.client
+import locatorator
+from locatorator.cache import LRUCache, content_hash
+from locatorator.timecodes import format_timecode
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 64
+
+class ComparisonService:
+	"""Compare and export marker lists, caching parsed lists by content hash"""
+
+	def __init__(self, cache_size:int=DEFAULT_CACHE_SIZE, shot_id_pattern:typing.Optional[re.Pattern]=None):
+		self._cache = LRUCache(cache_size)
+		self._shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+
+	@property
+	def cache(self) -> LRUCache:
+		"""The parsed marker list cache"""
+		return self._cache
+
+	def marker_list(self, data:bytes, rate:typing.Optional[int]=None) -> typing.List[locatorator.Marker]:
+		"""Get a parsed, sorted marker list from its raw contents, at `rate` or the rate detected from it"""
+
+		return self._cache.get_or_create((content_hash(data), self._shot_id_pattern.pattern, rate), lambda: locatorator.get_marker_list_from_bytes(data, self._shot_id_pattern, rate=rate))
+
+	def _marker_lists_from_request(self, payload:dict) -> typing.Tuple[typing.List[locatorator.Marker], typing.List[locatorator.Marker]]:
+		"""Load the old and new marker lists given by path (`old`/`new`) or contents (`old_text`/`new_text`), at the frame rate given by `rate` if any"""
+
+		rate = int(payload["rate"]) if payload.get("rate") is not None else None
+		marker_lists, datas = [], []
+
+		for side in ("old", "new"):
+			try:
+				if f"{side}_text" in payload:
+					data = str(payload[f"{side}_text"]).encode("utf-8")
+				elif side in payload:
+					data = pathlib.Path(payload[side]).read_bytes()
+				else:
+					raise ValueError(f"Expected \"{side}\" path or \"{side}_text\" contents")
+				datas.append(data)
+				marker_lists.append(self.marker_list(data, rate))
+			except Exception as e:
+				raise ValueError(f"{side.title()} marker list: {e}") from e
+
+		if rate is None:
+			marker_lists = locatorator.marker_lists_at_same_rate(marker_lists, lambda idx, rate: self.marker_list(datas[idx], rate))
+
+		return tuple(marker_lists)
+
+	def _build_marker_changes(self, payload:dict) -> locatorator.ChangeSet:
+		"""Compare the marker lists from a request, pairing up near-identical shot IDs too if `fuzzy` is given (`true` or a minimum confidence)"""
+
+		markers_old, markers_new = self._marker_lists_from_request(payload)
+
+		fuzzy_min_confidence = payload.get("fuzzy")
+		if fuzzy_min_confidence is True:
+			from locatorator import fuzzy
+			fuzzy_min_confidence = fuzzy.DEFAULT_MIN_CONFIDENCE
+		elif fuzzy_min_confidence is False:
+			fuzzy_min_confidence = None
+		elif fuzzy_min_confidence is not None:
+			fuzzy_min_confidence = float(fuzzy_min_confidence)
+
+		return locatorator.build_marker_changes(markers_old, markers_new, self._shot_id_pattern, fuzzy_min_confidence)
+
+	def compare(self, payload:dict) -> dict:
+		"""Compare two marker lists and report the changes"""
+
+		markers_changes = self._build_marker_changes(payload)
+
+		changes = []
+		for (change_type, marker_old, marker_new, offset_frames), confidence in zip(markers_changes.rows(), markers_changes.confidences):
+			marker = marker_new or marker_old
+			changes.append({
+				"change_type": change_type.name,
+				"shot_id": locatorator.vfx_id_from_marker(marker, self._shot_id_pattern),
+				"old_tc": format_timecode(marker_old.start_frame, marker_old.rate, marker_old.drop_frame) if marker_old else None,
+				"new_tc": format_timecode(marker_new.start_frame, marker_new.rate, marker_new.drop_frame) if marker_new else None,
+				"offset": format_timecode(offset_frames, marker.rate) if offset_frames is not None else None,
+				"confidence": confidence,
+			})
+
+		return {"changes": changes}
+
+	def export(self, payload:dict) -> dict:
+		"""Compare two marker lists and return the change list as an importable marker list"""
+
+		markers_changes = self._build_marker_changes(payload)
+
+		file_output = io.StringIO()
+		locatorator.write_change_list(
+			markers_changes,
+			file_output,
+			marker_name=payload.get("marker_name", "Locatorator"),
+			marker_track=payload.get("marker_track", "TC1"),
+			marker_color=locatorator.MarkerColors(str(payload.get("marker_color", "white")).lower()),
+			change_types=[locatorator.ChangeTypes[c.upper()] for c in payload.get("change_types", [])],
+			shot_id_pattern=self._shot_id_pattern
+		)
+
+		return {"marker_list": file_output.getvalue()}
+
+	def status(self) -> dict:
+		"""Report on the cache"""
+
+		return {
+			"cached_lists": len(self._cache),
+			"cache_size": self._cache.max_size,
+			"cache_hits": self._cache.hits,
+			"cache_misses": self._cache.misses,
+		}
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+	"""JSON over HTTP: `POST /compare`, `POST /export`, `GET /status`"""
+
+	server_version = "Locatorator"
+
+	def _respond(self, status:int, body:dict) -> None:
+
+		data = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_GET(self) -> None:
+
+		if self.path.rstrip("/") == "/status":
+			self._respond(200, self.server.service.status())
+		else:
+			self._respond(404, {"error": f"Unknown endpoint: {self.path}"})
+
+	def do_POST(self) -> None:
+
+		endpoints = {
+			"/compare": self.server.service.compare,
+			"/export":  self.server.service.export,
+		}
+
+		if self.path.rstrip("/") not in endpoints:
+			self._respond(404, {"error": f"Unknown endpoint: {self.path}"})
+			return
+
+		try:
+			payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+			self._respond(200, endpoints[self.path.rstrip("/")](payload))
+		except Exception as e:
+			self._respond(400, {"error": str(e)})
+
+	def address_string(self) -> str:
+		# Unix socket clients have no address
+		return str(self.client_address[0]) if self.client_address else "local"
+
+class _TCPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+	daemon_threads = True
+
+if hasattr(socket, "AF_UNIX"):
+	class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+		daemon_threads = True
+
+def _remove_stale_socket(socket_path:pathlib.Path) -> None:
+	"""Remove a socket left behind by an earlier server, but never anything else"""
+
+	try:
+		mode = socket_path.lstat().st_mode
+	except FileNotFoundError:
+		return
+
+	if not stat.S_ISSOCK(mode):
+		raise ValueError(f"Not replacing {socket_path}, since it isn't a socket")
+
+	socket_path.unlink()
+
+def create_server(host:str=DEFAULT_HOST, port:int=DEFAULT_PORT, socket_path:typing.Optional[str]=None, cache_size:int=DEFAULT_CACHE_SIZE, shot_id_pattern:typing.Optional[re.Pattern]=None) -> socketserver.BaseServer:
+	"""Create a comparison server on localhost, or on a Unix socket if `socket_path` is given"""
+
+	if socket_path:
+		if not hasattr(socket, "AF_UNIX"):
+			raise ValueError("Unix sockets are not supported on this platform")
+		_remove_stale_socket(pathlib.Path(socket_path))
+		server = _UnixServer(socket_path, _RequestHandler)
+	else:
+		server = _TCPServer((host, port), _RequestHandler)
+
+	server.service = ComparisonService(cache_size, shot_id_pattern)
+	return server
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+	"""HTTP connection over a Unix socket"""
+
+	def __init__(self, socket_path:str, timeout:float):
+		super().__init__("localhost", timeout=timeout)
+		self._socket_path = socket_path
+
+	def connect(self) -> None:
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.sock.settimeout(self.timeout)
+		self.sock.connect(self._socket_path)
+
+def send_request(endpoint:str, payload:typing.Optional[dict]=None, host:str=DEFAULT_HOST, port:int=DEFAULT_PORT, socket_path:typing.Optional[str]=None, timeout:float=30) -> dict:
+	"""Send a request to a running comparison server and return its JSON response"""
+
+	connection = _UnixHTTPConnection(socket_path, timeout) if socket_path else http.client.HTTPConnection(host, port, timeout=timeout)
+
+	try:
+		if payload is None:
+			connection.request("GET", "/" + endpoint.lstrip("/"))
+		else:
+			connection.request("POST", "/" + endpoint.lstrip("/"), body=json.dumps(payload), headers={"Content-Type": "application/json"})
+		response = connection.getresponse()
+		body = json.loads(response.read() or b"{}")
+	finally:
+		connection.close()
+
+	if response.status != 200:
+		raise ValueError(body.get("error", f"Server responded with status {response.status}"))
+
+	return body
@@ -0,0 +1,197 @@
+"""Fast conversions between frame numbers and timecode strings"""
+
+import typing, functools
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+DEFAULT_RATE = 24
+"""Frame rate assumed for marker lists, which don't say"""
+
+DROP_FRAME_RATES = {30, 60}
+"""Nominal frame rates for which drop-frame timecode applies"""
+
+STANDARD_RATES = (24, 25, 30, 50, 60)
+"""Nominal frame rates a marker list's rate is detected from"""
+
+def timecode_rate(timecode:typing.Any) -> int:
+	"""The nominal frame rate of a `Timecode` (Ex: 24 for 23.976), or the default rate"""
+	return round(float(getattr(timecode, "rate", DEFAULT_RATE) or DEFAULT_RATE))
+
+def timecode_drop_frame(timecode:typing.Any) -> bool:
+	"""Whether a `Timecode` (or timecode string) is written as drop-frame"""
+
+	drop_frame = getattr(timecode, "drop_frame", None)
+	if drop_frame is not None:
+		return bool(drop_frame)
+
+	return ";" in str(timecode)
+
+@functools.lru_cache(maxsize=65536)
+def format_timecode(frame_number:int, rate:int=DEFAULT_RATE, drop_frame:bool=False) -> str:
+	"""Format a frame number as a `HH:MM:SS:FF` (or drop-frame `HH:MM:SS;FF`) timecode string
+
+	Frame numbers are only skipped for drop-frame at the rates it applies to, but the separator is kept either way.
+	"""
+
+	sign = "-" if frame_number < 0 else ""
+	frames = abs(frame_number)
+
+	if drop_frame and rate in DROP_FRAME_RATES:
+		# Add back the frame numbers skipped every minute, except every tenth minute
+		dropped = rate // 15
+		frames_per_ten_minutes = rate * 600 - dropped * 9
+		frames_per_minute = rate * 60 - dropped
+
+		tens, remainder = divmod(frames, frames_per_ten_minutes)
+		frames += dropped * 9 * tens
+		if remainder > dropped:
+			frames += dropped * ((remainder - dropped) // frames_per_minute)
+
+	seconds, ff = divmod(frames, rate)
+	minutes, ss = divmod(seconds, 60)
+	hh, mm = divmod(minutes, 60)
+
+	return f"{sign}{hh:02}:{mm:02}:{ss:02}{';' if drop_frame else ':'}{ff:02}"
+
+def timecode_to_string(timecode:typing.Any, drop_frame:typing.Optional[bool]=None) -> str:
+	"""Format a `Timecode` as a string at its own rate (and as drop-frame if it is, unless told), reusing previous results"""
+	return format_timecode(timecode.frame_number, timecode_rate(timecode), timecode_drop_frame(timecode) if drop_frame is None else drop_frame)
+
+class TimecodeParseError(ValueError):
+	"""A timecode string in a batch could not be parsed"""
+
+	def __init__(self, index:int, text:str):
+		super().__init__(f"Invalid timecode: {text}")
+		self.index = index
+		"""Position of the bad timecode in the batch"""
+		self.text = text
+		"""The bad timecode"""
+
+	def __reduce__(self):
+		return (self.__class__, (self.index, self.text))
+
+def _frames_from_parts(hh:int, mm:int, ss:int, ff:int, rate:int, drop_frame:bool) -> int:
+	"""Count frames from timecode fields"""
+
+	frames = ((hh * 60 + mm) * 60 + ss) * rate + ff
+
+	if drop_frame and rate in DROP_FRAME_RATES:
+		minutes = hh * 60 + mm
+		frames -= (rate // 15) * (minutes - minutes // 10)
+
+	return frames
+
+def parse_timecode(text:str, rate:int=DEFAULT_RATE, drop_frame:typing.Optional[bool]=None) -> int:
+	"""Convert a `HH:MM:SS:FF` (or drop-frame `HH:MM:SS;FF`) timecode string, or a plain frame count, to a frame number
+
+	Shorter timecodes count from the right (Ex: `SS:FF`).  Fields out of range for the rate are an error.  Drop-frame
+	is taken from the separator unless `drop_frame` is given.
+	"""
+
+	text = text.strip()
+
+	if text.isdigit():
+		return int(text)
+
+	parts = text.replace(";", ":").split(":")
+
+	if not 1 < len(parts) <= 4 or not all(p.isdigit() for p in parts):
+		raise ValueError(f"Invalid timecode: {text}")
+
+	hh, mm, ss, ff = [0] * (4 - len(parts)) + [int(p) for p in parts]
+	drop_frame = ";" in text if drop_frame is None else drop_frame
+
+	if mm >= 60 or ss >= 60 or ff >= rate:
+		raise ValueError(f"Invalid timecode for {rate} fps: {text}")
+	
+	# Drop-frame skips the first frame numbers of every minute, except every tenth minute
+	if drop_frame and rate in DROP_FRAME_RATES and ss == 0 and mm % 10 and ff < rate // 15:
+		raise ValueError(f"Invalid drop-frame timecode: {text}")
+
+	return _frames_from_parts(hh, mm, ss, ff, rate=rate, drop_frame=drop_frame)
+
+def to_frame_number(timecode:typing.Union[int,str,typing.Any], rate:int=DEFAULT_RATE, drop_frame:typing.Optional[bool]=None) -> int:
+	"""A frame number from a frame number, timecode string or `Timecode`"""
+
+	if isinstance(timecode, int):
+		return timecode
+	if isinstance(timecode, str):
+		return parse_timecode(timecode, rate, drop_frame)
+	return timecode.frame_number
+
+def detect_rate(texts:typing.Iterable[str]) -> int:
+	"""The lowest standard frame rate every timecode string fits (only drop-frame rates if any are drop-frame)
+
+	Marker lists don't say their rate, so this is the best guess there is: a short 25 fps list which never reaches
+	frame 24 will look like 24 fps.
+	"""
+
+	max_frame, drop_frame = 0, False
+
+	for text in texts:
+		separator = max(text.rfind(":"), text.rfind(";"))
+		field = text[separator+1:].strip()
+		if separator >= 0 and field.isdigit():
+			max_frame = max(max_frame, int(field))
+			drop_frame = drop_frame or text[separator] == ";"
+
+	rates = sorted(DROP_FRAME_RATES) if drop_frame else STANDARD_RATES
+
+	# Nothing fits: let the parser report it at the highest rate
+	return next((rate for rate in rates if rate > max_frame), rates[-1])
+
+def parse_timecodes(texts:typing.Sequence[str], rate:int=DEFAULT_RATE) -> typing.List[int]:
+	"""Convert a batch of timecode strings to frame numbers, raising `TimecodeParseError` for the first bad one"""
+
+	if numpy is not None and len(texts) > 1:
+		frames = _parse_timecodes_numpy(texts, rate)
+		if frames is not None:
+			return frames
+
+	frames = []
+	for idx, text in enumerate(texts):
+		try:
+			frames.append(parse_timecode(text, rate))
+		except ValueError:
+			raise TimecodeParseError(idx, text) from None
+
+	return frames
+
+def _parse_timecodes_numpy(texts:typing.Sequence[str], rate:int) -> typing.Optional[typing.List[int]]:
+	"""Convert uniform `HH:MM:SS:FF` strings all at once, or `None` if they aren't all well-formed"""
+
+	width = len("00:00:00:00")
+
+	if any(len(text) != width for text in texts):
+		return None
+
+	try:
+		chars = numpy.frombuffer("".join(texts).encode("ascii"), dtype=numpy.uint8)
+	except UnicodeEncodeError:
+		return None
+
+	chars = chars.reshape(len(texts), width)
+	digits = chars[:, [0,1,3,4,6,7,9,10]].astype(numpy.int64) - ord("0")
+	separators = chars[:, [2,5,8]]
+
+	if ((digits < 0) | (digits > 9)).any() or not numpy.isin(separators, (ord(":"), ord(";"))).all():
+		return None
+
+	hh, mm, ss, ff = (digits[:, i] * 10 + digits[:, i+1] for i in range(0, 8, 2))
+
+	# Let the one-at-a-time parser find and report anything out of range
+	if (mm >= 60).any() or (ss >= 60).any() or (ff >= rate).any():
+		return None
+	if rate in DROP_FRAME_RATES and ((separators[:, 2] == ord(";")) & (ss == 0) & (mm % 10 != 0) & (ff < rate // 15)).any():
+		return None
+	frames = ((hh * 60 + mm) * 60 + ss) * rate + ff
+
+	if rate in DROP_FRAME_RATES:
+		minutes = hh * 60 + mm
+		drop_frame = separators[:, 2] == ord(";")
+		frames -= numpy.where(drop_frame, (rate // 15) * (minutes - minutes // 10), 0)
+
+	return frames.tolist()
@@ -0,0 +1,242 @@
+"""Keep a comparison up to date while its marker lists are re-exported"""
+
+import typing, re, io, os, sys, time, select, struct, pathlib, threading
+import ctypes, ctypes.util
+import locatorator
+from locatorator.cache import content_hash
+
+DEFAULT_DEBOUNCE = 0.5
+"""Seconds to wait for a burst of writes to settle before comparing"""
+
+DEFAULT_POLL_INTERVAL = 1.0
+"""Seconds between checks when inotify isn't available"""
+
+# From <sys/inotify.h>
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class _InotifyWatcher:
+	"""Wait for changes to files (or to any file in `folders`) with Linux's inotify"""
+
+	def __init__(self, paths:typing.Iterable[pathlib.Path], folders:typing.Iterable[pathlib.Path]=()):
+
+		self._paths = {pathlib.Path(p).resolve() for p in paths}
+		self._whole_folders = {pathlib.Path(f).resolve() for f in folders}
+
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+		self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self._fd < 0:
+			raise OSError(ctypes.get_errno(), "Cannot start inotify")
+
+		# Watch the folders, since exports often replace the file rather than write to it
+		self._folders = {}
+		for folder in {p.parent for p in self._paths} | self._whole_folders:
+			wd = libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+			if wd < 0:
+				os.close(self._fd)
+				raise OSError(ctypes.get_errno(), f"Cannot watch {folder}")
+			self._folders[wd] = folder
+
+	def wait(self, timeout:float) -> typing.Set[pathlib.Path]:
+		"""Wait up to `timeout` seconds for any of the files to change"""
+
+		if not select.select([self._fd], [], [], timeout)[0]:
+			return set()
+
+		changed = set()
+
+		while True:
+			try:
+				data = os.read(self._fd, 64 * 1024)
+			except BlockingIOError:
+				break
+
+			offset = 0
+			while offset < len(data):
+				wd, _, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+				name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + name_length].rstrip(b"\0")
+				offset += _INOTIFY_EVENT.size + name_length
+
+				folder = self._folders.get(wd, pathlib.Path())
+				path = folder / os.fsdecode(name)
+				if path in self._paths or (name and folder in self._whole_folders):
+					changed.add(path)
+
+		return changed
+
+	def close(self) -> None:
+		os.close(self._fd)
+
+class _PollingWatcher:
+	"""Wait for changes to files (or to any file in `folders`) by checking their modification times"""
+
+	def __init__(self, paths:typing.Iterable[pathlib.Path], poll_interval:float=DEFAULT_POLL_INTERVAL, folders:typing.Iterable[pathlib.Path]=()):
+
+		self._poll_interval = poll_interval
+		self._folders = [pathlib.Path(f).resolve() for f in folders]
+		self._stats = {pathlib.Path(p).resolve(): None for p in paths}
+		for path in self._stats:
+			self._stats[path] = self._stat(path)
+		for path in self._folder_files():
+			self._stats[path] = self._stat(path)
+
+	def _folder_files(self) -> typing.List[pathlib.Path]:
+		return [path for folder in self._folders for path in folder.iterdir() if path.is_file()]
+
+	@staticmethod
+	def _stat(path:pathlib.Path) -> typing.Optional[typing.Tuple[int,int]]:
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return stat.st_mtime_ns, stat.st_size
+
+	def wait(self, timeout:float) -> typing.Set[pathlib.Path]:
+		"""Wait up to `timeout` seconds for any of the files to change"""
+
+		deadline = time.monotonic() + timeout
+
+		while True:
+			changed = set()
+
+			for path in self._folder_files():
+				self._stats.setdefault(path, None)
+
+			for path, stat in self._stats.items():
+				if self._stat(path) != stat:
+					self._stats[path] = self._stat(path)
+					changed.add(path)
+
+			if changed or time.monotonic() >= deadline:
+				return changed
+
+			time.sleep(min(self._poll_interval, max(deadline - time.monotonic(), 0)))
+
+	def close(self) -> None:
+		pass
+
+def watch_paths(paths:typing.Iterable[typing.Union[str,pathlib.Path]], debounce:float=DEFAULT_DEBOUNCE, poll_interval:float=DEFAULT_POLL_INTERVAL, stop:typing.Optional[threading.Event]=None, folders:typing.Iterable[typing.Union[str,pathlib.Path]]=(), timed:bool=False) -> typing.Iterator[typing.Union[typing.Set[pathlib.Path], typing.Tuple[typing.Set[pathlib.Path], float]]]:
+	"""Yield the files (from `paths`, or anywhere in `folders`) which changed, once each burst of changes has settled, until `stop` is set
+
+	If `timed`, yields them with the `time.monotonic()` the burst was first noticed.
+	"""
+
+	paths = [pathlib.Path(p).resolve() for p in paths]
+	folders = [pathlib.Path(f).resolve() for f in folders]
+
+	try:
+		watcher = _InotifyWatcher(paths, folders) if sys.platform.startswith("linux") else _PollingWatcher(paths, poll_interval, folders)
+	except (OSError, AttributeError):
+		# No inotify here (Ex: not Linux, or no libc to be found)
+		watcher = _PollingWatcher(paths, poll_interval, folders)
+
+	try:
+		while stop is None or not stop.is_set():
+
+			changed = watcher.wait(timeout=poll_interval)
+			if not changed:
+				continue
+			noticed = time.monotonic()
+
+			while more := watcher.wait(timeout=debounce):
+				changed |= more
+
+			yield (changed, noticed) if timed else changed
+
+	finally:
+		watcher.close()
+
+class ComparisonWatcher:
+	"""Compare two marker lists, and compare them again whenever their contents change"""
+
+	def __init__(self, path_old:typing.Union[str,pathlib.Path], path_new:typing.Union[str,pathlib.Path], path_output:typing.Union[str,pathlib.Path], shot_id_pattern:typing.Optional[re.Pattern]=None, marker_filter:typing.Optional[locatorator.MarkerFilter]=None, fuzzy_min_confidence:typing.Optional[float]=None):
+
+		self._path_old = pathlib.Path(path_old).resolve()
+		self._path_new = pathlib.Path(path_new).resolve()
+		self._path_output = pathlib.Path(path_output)
+
+		self._shot_id_pattern = shot_id_pattern or locatorator.get_shot_id_pattern()
+		self._marker_filter = marker_filter
+		self._fuzzy_min_confidence = fuzzy_min_confidence
+
+		self._hashes:dict[pathlib.Path, str] = {}
+		self._markers:dict[pathlib.Path, typing.List[locatorator.Marker]] = {}
+
+		# Lists re-parsed since the last comparison which succeeded
+		self._stale:typing.Set[pathlib.Path] = set()
+		self._markers_changes:typing.Optional[locatorator.ChangeSet] = None
+		self._output = None
+
+	@property
+	def markers_changes(self) -> typing.Optional[locatorator.ChangeSet]:
+		"""The latest comparison"""
+		return self._markers_changes
+
+	def _load(self, path:pathlib.Path, side:str) -> bool:
+		"""Parse a marker list again if its contents changed, returning whether they did"""
+
+		try:
+			data = path.read_bytes()
+			file_hash = content_hash(data)
+			if self._hashes.get(path) == file_hash:
+				return False
+
+			# Parse what was hashed, in case the file is written again in the meantime
+			self._markers[path] = locatorator.get_marker_list_from_bytes(data, self._shot_id_pattern, self._marker_filter)
+			self._hashes[path] = file_hash
+
+		except Exception as e:
+			raise locatorator.MarkerListLoadError(side, e) from e
+
+		self._stale.add(path)
+		return True
+
+	def refresh(self, changed:typing.Optional[typing.Iterable[pathlib.Path]]=None) -> bool:
+		"""Compare again if either list changed (or check both if not told which), and return whether the output was rewritten"""
+
+		changed = set(changed) if changed is not None else {self._path_old, self._path_new}
+
+		# Either list may have failed to load last time
+		if self._path_old in changed or self._path_old not in self._markers:
+			self._load(self._path_old, "Old")
+		if self._path_new in changed or self._path_new not in self._markers:
+			self._load(self._path_new, "New")
+
+		# A list loaded by an earlier refresh which then failed still needs comparing
+		if self._markers_changes is not None and not self._stale:
+			return False
+
+		markers_old, markers_new = self._markers[self._path_old], self._markers[self._path_new]
+
+		# With the same old list, only the changes after the first difference in the new list need recomputing
+		if self._markers_changes is not None and self._path_old not in self._stale:
+			self._markers_changes = locatorator.update_marker_changes(self._markers_changes, markers_new, self._shot_id_pattern, self._fuzzy_min_confidence)
+		else:
+			self._markers_changes = locatorator.build_marker_changes(markers_old, markers_new, self._shot_id_pattern, self._fuzzy_min_confidence)
+		
+		self._stale.clear()
+
+		file_output = io.StringIO()
+		locatorator.write_change_list(self._markers_changes, file_output, shot_id_pattern=self._shot_id_pattern)
+
+		if file_output.getvalue() == self._output and self._path_output.exists():
+			return False
+
+		self._path_output.write_text(file_output.getvalue())
+		self._output = file_output.getvalue()
+
+		return True
+
+	def run(self, debounce:float=DEFAULT_DEBOUNCE, poll_interval:float=DEFAULT_POLL_INTERVAL, stop:typing.Optional[threading.Event]=None, report:typing.Callable[[str], None]=print) -> None:
+		"""Keep the output up to date until `stop` is set"""
+
+		for changed in watch_paths((self._path_old, self._path_new), debounce, poll_interval, stop):
+			try:
+				if self.refresh(changed):
+					report(f"Marker list output to {self._path_output}")
+			except Exception as e:
+				# A list caught mid-export will likely be fine next time
+				report(str(e))
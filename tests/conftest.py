@@ -0,0 +1,11 @@
+import pytest
+
+@pytest.fixture
+def old_list():
+	"""A short marker list"""
+	return "Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed\nEditor\t01:00:05:00\tV1\tRed\tLF1001 note\t1\t\tRed\n"
+
+@pytest.fixture
+def new_list():
+	"""The next version of `old_list`, with its second shot a second later"""
+	return "Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed\nEditor\t01:00:06:00\tV1\tRed\tLF1001 note\t1\t\tRed\n"
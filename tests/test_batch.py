@@ -0,0 +1,37 @@
+import io
+import pytest
+from locatorator import batch, ChangeTypes
+
+def test_read_manifest(tmp_path):
+
+	jobs = batch.read_manifest(io.StringIO("# old\tnew\toutput\n\na.txt\tb.txt\tout.txt\n"), tmp_path)
+	assert jobs == [batch.BatchJob(tmp_path / "a.txt", tmp_path / "b.txt", tmp_path / "out.txt")]
+
+	with pytest.raises(ValueError, match="line 2"):
+		batch.read_manifest(io.StringIO("a.txt\tb.txt\tout.txt\na.txt\tb.txt\n"))
+
+def test_run_batch(tmp_path, old_list, new_list):
+
+	(tmp_path / "old.txt").write_text(old_list)
+	(tmp_path / "new.txt").write_text(new_list)
+
+	# Two reels against the same old cut, a chained pair, and a missing list, in manifest order
+	jobs = [
+		batch.BatchJob(tmp_path / "old.txt", tmp_path / "new.txt", tmp_path / "1.txt"),
+		batch.BatchJob(tmp_path / "old.txt", tmp_path / "old.txt", tmp_path / "2.txt"),
+		batch.BatchJob(tmp_path / "new.txt", tmp_path / "old.txt", tmp_path / "3.txt"),
+		batch.BatchJob(tmp_path / "old.txt", tmp_path / "missing.txt", tmp_path / "4.txt"),
+	]
+	results = batch.run_batch(jobs, max_workers=2)
+
+	assert [result.job for result in results] == jobs
+	assert results[0].change_counts[ChangeTypes.CHANGED] == 1
+	assert results[1].change_counts[ChangeTypes.UNCHANGED] == 2
+	assert results[2].change_counts[ChangeTypes.CHANGED] == 1
+	assert results[3].error.startswith("New marker list:")
+	assert (tmp_path / "1.txt").read_text()
+	assert not (tmp_path / "4.txt").exists()
+
+	summary = io.StringIO()
+	batch.write_batch_summary(results, summary)
+	assert summary.getvalue().count("\n") == 5
@@ -0,0 +1,64 @@
+import os
+import pytest
+import locatorator
+from locatorator.cache import ComparisonCache, LRUCache
+
+def test_lru_eviction_callback():
+
+	evicted = []
+	cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+
+	for key in "abc":
+		cache.put(key, key)
+
+	assert evicted == ["a"]
+	assert "a" not in cache
+
+def test_reuses_and_refreshes_comparisons(tmp_path, old_list, new_list):
+
+	path_old, path_new = tmp_path / "old.txt", tmp_path / "new.txt"
+	path_old.write_text(old_list)
+	path_new.write_text(new_list)
+
+	comparisons = ComparisonCache()
+	first = comparisons.compare(path_old, path_new)
+	assert comparisons.compare(path_old, path_new) is first
+	assert first.summary.has_changes
+
+	path_new.write_text(old_list)
+	os.utime(path_new, ns=(0, 0))
+
+	refreshed = comparisons.compare(path_old, path_new)
+	assert refreshed is not first
+	assert not refreshed.summary.has_changes
+	assert len(comparisons.cache) == 1
+
+def test_evicted_comparisons_are_forgotten(tmp_path, old_list, new_list):
+
+	comparisons = ComparisonCache(max_size=2)
+	path_old = tmp_path / "old.txt"
+	path_old.write_text(old_list)
+
+	for idx in range(10):
+		path_new = tmp_path / f"new_{idx}.txt"
+		path_new.write_text(new_list + f"Editor\t01:00:{10+idx:02}:00\tV1\tRed\tLF2{idx:03} note\t1\t\tRed\n")
+		comparisons.compare(path_old, path_new)
+
+	assert len(comparisons.cache) == 2
+	assert len(comparisons._key_paths) == 2
+	assert len(comparisons._file_keys) == 3
+	assert sum(len(keys) for keys in comparisons._file_keys.values()) == 4
+
+def test_failed_lists_are_named(tmp_path, old_list):
+
+	path_old = tmp_path / "old.txt"
+	path_old.write_text(old_list)
+
+	with pytest.raises(locatorator.MarkerListLoadError) as error:
+		ComparisonCache().compare(path_old, tmp_path / "missing.txt")
+	assert error.value.side == "New"
+
+	(tmp_path / "bad.txt").write_text("Editor\t01:00:0\n")
+	with pytest.raises(locatorator.MarkerListLoadError) as error:
+		ComparisonCache().compare(tmp_path / "bad.txt", path_old)
+	assert error.value.side == "Old"
@@ -0,0 +1,43 @@
+import time
+from locatorator import dropfolder
+
+def test_reel_from_path():
+
+	assert dropfolder.reel_from_path("R1_v003.txt") == ("r1", 3)
+	assert dropfolder.reel_from_path("Reel 2 - 20240105.txt") == ("reel 2", 20240105)
+	assert dropfolder.reel_from_path("Reel 100.txt") == ("reel 100", None)
+
+def test_output_in_the_input_folder(tmp_path, old_list, new_list):
+
+	(tmp_path / "R1_v001.txt").write_text(old_list)
+
+	with dropfolder.DropFolder(tmp_path, tmp_path, max_workers=1) as drop_folder:
+
+		(tmp_path / "R1_v002.txt").write_text(new_list)
+		noticed = time.monotonic() - 10
+		result, = drop_folder.ingest([tmp_path / "R1_v002.txt", tmp_path / "gone_v003.txt"], noticed)
+
+		assert result.error is None
+		assert result.path_output.parent == tmp_path
+		assert result.latency >= 10
+
+		# The change list just written isn't a new version of anything
+		assert drop_folder.ingest([result.path_output]) == []
+
+def test_re_export_after_eviction(tmp_path, old_list, new_list):
+
+	path_output = tmp_path / "changes"
+
+	with dropfolder.DropFolder(tmp_path, path_output, max_reels=1, max_workers=1) as drop_folder:
+
+		(tmp_path / "R1.txt").write_text(old_list)
+		(tmp_path / "R2.txt").write_text(old_list)
+		drop_folder.ingest([tmp_path / "R1.txt"])
+		drop_folder.ingest([tmp_path / "R2.txt"])
+
+		# R1's last contents were pushed out of the cache by R2
+		(tmp_path / "R1.txt").write_text(new_list)
+		result, = drop_folder.ingest([tmp_path / "R1.txt"])
+
+		assert result.path_output is None
+		assert "nothing to compare" in result.error
@@ -0,0 +1,26 @@
+import random
+from locatorator import fuzzy
+
+def test_edit_distance():
+
+	assert fuzzy.edit_distance("kitten", "sitting") == 3
+	assert fuzzy.edit_distance("kitten", "sitting", max_distance=1) == 2
+
+def test_repeated_ngrams_are_not_ruled_out():
+
+	random.seed(4)
+
+	for _ in range(2000):
+		# Candidates come from shared n-grams, so give them a common prefix as real shot IDs have
+		vfx_id_old = "LF" + "".join(random.choice("A1") for _ in range(random.randint(3, 8)))
+		vfx_id_new = "LF" + "".join(random.choice("A1") for _ in range(random.randint(3, 8)))
+
+		score = fuzzy.confidence(vfx_id_old, vfx_id_new, fuzzy.edit_distance(vfx_id_old.lower(), vfx_id_new.lower()))
+		matches = fuzzy.find_fuzzy_matches([vfx_id_old], [vfx_id_new], min_confidence=0.6)
+
+		assert bool(matches) == (score >= 0.6), (vfx_id_old, vfx_id_new)
+
+def test_best_matches_first():
+
+	matches = fuzzy.find_fuzzy_matches(["LF1020", "LF2000"], ["LF1021", "LF2000_pt1"])
+	assert [(old, new) for old, new, _ in matches] == [("LF1020", "LF1021"), ("LF2000", "LF2000_pt1")]
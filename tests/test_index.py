@@ -0,0 +1,51 @@
+import random
+import locatorator
+from locatorator.index import MarkerIndex
+
+def marker(start_frame, duration, comment):
+	return locatorator.Marker(name="Editor", tc_start=start_frame, track="V1", color="red", comment=comment, duration=duration)
+
+MARKERS = [marker(30, 0, "D"), marker(0, 10, "A"), marker(5, 1, "B"), marker(5, 20, "C")]
+
+def comments(markers):
+	return [m.comment for m in markers]
+
+def test_spanned_markers():
+
+	index = MarkerIndex(MARKERS)
+
+	assert comments(index) == ["A", "B", "C", "D"]
+	assert comments(index.overlapping(6, 8)) == ["A", "C"]
+	assert comments(index.at(5)) == ["A", "B", "C"]
+	assert comments(index.at("00:00:00:05")) == ["A", "B", "C"]
+	assert comments(index.at(25)) == []
+
+	# Markers without a duration still cover their own frame
+	assert comments(index.at(30)) == ["D"]
+	assert comments(index.starting_between(5, 30)) == ["B", "C"]
+
+def test_overlapping_matches_a_scan():
+
+	random.seed(1)
+	markers = [marker(random.randint(0, 1000), random.choice([0, 1, 5, 50, 400]), str(idx)) for idx in range(300)]
+	index = MarkerIndex(markers)
+
+	for _ in range(200):
+		start = random.randint(-10, 1100)
+		end = start + random.randint(1, 100)
+		expected = [m for m in index.markers if m.start_frame < end and m.start_frame + max(m.duration_frames, 1) > start]
+		assert index.overlapping(start, end) == expected
+
+def test_nearest():
+
+	index = MarkerIndex([marker(10, 1, "A"), marker(20, 1, "B")])
+
+	assert index.nearest(0).comment == "A"
+	assert index.nearest(14).comment == "A"
+	assert index.nearest(16).comment == "B"
+	assert index.nearest(100).comment == "B"
+
+	# Ties go to the earlier marker
+	assert index.nearest(15).comment == "A"
+
+	assert MarkerIndex([]).nearest(15) is None
@@ -0,0 +1,133 @@
+import io
+import pytest
+import locatorator
+
+def marker(line):
+	return locatorator.Marker.from_string(line)
+
+def test_markers_at_the_same_time_are_not_equal():
+
+	marker_v1 = marker("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed")
+	marker_v2 = marker("Editor\t01:00:00:00\tV2\tRed\tLF1000 note\t1\t\tRed")
+
+	assert marker_v1 != marker_v2
+	assert len({marker_v1, marker_v2}) == 2
+	assert marker_v1 == marker("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed")
+
+def test_identical_prefix_length():
+
+	markers_old = [marker(f"Editor\t01:00:{idx:02}:00\tV1\tRed\tLF{1000+idx} note\t1\t\tRed") for idx in range(10)]
+	markers_new = list(markers_old)
+	markers_new[6] = marker("Editor\t01:00:06:00\tV1\tRed\tLF1006 changed\t1\t\tRed")
+
+	assert locatorator.identical_prefix_length(markers_old, markers_new) == 6
+	assert locatorator.identical_prefix_length(markers_old, markers_old[:4]) == 4
+	assert locatorator.identical_prefix_length(markers_old, list(markers_old)) == 10
+
+def test_identical_files_are_parsed_once(tmp_path):
+
+	path_old, path_new = tmp_path / "old.txt", tmp_path / "new.txt"
+	for path in (path_old, path_new):
+		path.write_text("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed\n")
+
+	markers_old, markers_new = locatorator.get_marker_lists_from_paths(path_old, path_new)
+	assert markers_old == markers_new
+	assert markers_old[0] is markers_new[0]
+
+def test_window_frame_numbers():
+
+	markers = [marker("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed")]
+
+	assert locatorator.window_frame_numbers("01:00:00:00", None, markers) == (86400, None)
+	assert locatorator.window_frame_numbers(None, "01:00:01:00", markers) == (None, 86424)
+
+	for window_start, window_end in (("01:00:00:30", None), ("01:00:10:00", "01:00:00:00"), ("nonsense", None)):
+		with pytest.raises(locatorator.TimecodeWindowError):
+			locatorator.window_frame_numbers(window_start, window_end, markers)
+
+def test_window_with_mixed_rates():
+
+	markers = [
+		locatorator.Marker(name="Editor", tc_start=0, track="V1", color="red", comment="LF1000", duration=1, rate=24),
+		locatorator.Marker(name="Editor", tc_start=0, track="V1", color="red", comment="LF1001", duration=1, rate=30, drop_frame=True),
+	]
+
+	with pytest.raises(locatorator.TimecodeWindowError, match="mix frame rates"):
+		locatorator.window_frame_numbers("01:00:00:00", None, markers)
+	
+	assert locatorator.window_frame_numbers(86400, None, markers) == (86400, None)
+
+def test_change_set_round_trip():
+
+	markers_old = [marker("Editor\t01:00:00;00\tV1\tRed\tLF1000 note\t1\t\tRed"), marker("Editor\t01:00:05;00\tV1\tRed\tLF1001 note\t1\t\tRed")]
+	markers_new = [marker("Editor\t01:00:00;00\tV1\tRed\tLF1000 note\t1\t\tRed"), marker("Editor\t01:00:06;00\tV1\tRed\tLF1001 note\t1\t\tRed")]
+	changes = locatorator.build_marker_changes(markers_old, markers_new)
+
+	restored = locatorator.ChangeSet.from_bytes(changes.to_bytes())
+
+	assert list(restored.rows()) == list(changes.rows())
+	assert list(restored.confidences) == list(changes.confidences)
+	assert [(m.rate, m.drop_frame) for m in restored.markers_new] == [(m.rate, m.drop_frame) for m in markers_new]
+	assert restored.summary.rate == changes.summary.rate
+
+def test_renamed_shot_is_reported():
+
+	markers_old = [marker("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed"), marker("Editor\t01:00:05:00\tV1\tRed\tLF1001 note\t1\t\tRed")]
+	markers_new = [marker("Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed"), marker("Editor\t01:00:05:00\tV1\tRed\tLF1101 note\t1\t\tRed")]
+	changes = locatorator.build_marker_changes(markers_old, markers_new, fuzzy_min_confidence=0.5)
+
+	assert [change_type for change_type, *_ in changes.rows()] == [locatorator.ChangeTypes.UNCHANGED, locatorator.ChangeTypes.RENAMED]
+	assert changes.summary.has_changes
+
+	output = io.StringIO()
+	locatorator.write_change_list(changes, output)
+	lines = output.getvalue().splitlines()
+	assert len(lines) == 1
+	assert lines[0].split("\t")[1] == "01:00:05:00"
+	assert "Now LF1101" in lines[0]
+
+def shots(*entries):
+	return [marker(f"Editor\t01:00:{seconds:02}:00\tV1\tRed\t{vfx_id} note\t1\t\tRed") for vfx_id, seconds in entries]
+
+def assert_same_changes(changes, expected):
+	assert list(changes.rows()) == list(expected.rows())
+	assert list(changes.confidences) == list(expected.confidences)
+	assert changes.summary.change_counts == expected.summary.change_counts
+
+def test_update_marker_changes():
+
+	markers_old = shots(("LF1000", 0), ("LF1001", 5), ("LF1002", 10), ("LF1003", 15), ("LF1004", 20))
+	markers_new = shots(("LF1000", 0), ("LF1001", 5), ("LF1002", 10), ("LF1003", 15), ("LF1004", 20))
+	previous = locatorator.build_marker_changes(markers_old, markers_new)
+
+	# Edited in the middle, with everything after it moving down
+	markers_edited = shots(("LF1000", 0), ("LF1001", 5), ("LF1002", 11), ("LF1003", 16), ("LF1004", 21))
+	assert_same_changes(locatorator.update_marker_changes(previous, markers_edited), locatorator.build_marker_changes(markers_old, markers_edited))
+
+	# A shot appended, and one dropped from the middle
+	markers_appended = shots(("LF1000", 0), ("LF1001", 5), ("LF1003", 15), ("LF1004", 20), ("LF1005", 25))
+	changes = locatorator.update_marker_changes(previous, markers_appended)
+	assert_same_changes(changes, locatorator.build_marker_changes(markers_old, markers_appended))
+	assert changes.summary.change_counts[locatorator.ChangeTypes.ADDED] == 1
+	assert changes.summary.change_counts[locatorator.ChangeTypes.DELETED] == 1
+
+	# Updating an update works the same
+	assert_same_changes(locatorator.update_marker_changes(changes, markers_edited), locatorator.build_marker_changes(markers_old, markers_edited))
+
+def test_update_marker_changes_fallbacks(monkeypatch):
+
+	markers_old = shots(("LF1000", 0), ("LF1001", 5), ("LF1002", 10))
+	markers_new = shots(("LF1000", 0), ("LF1001", 5), ("LF1102", 10))
+	markers_edited = shots(("LF1000", 0), ("LF1001", 6), ("LF1102", 11))
+
+	# Fuzzy matches, asked for now or found last time
+	previous = locatorator.build_marker_changes(markers_old, markers_new, fuzzy_min_confidence=0.5)
+	assert any(c < 1 for c in previous.confidences)
+	assert_same_changes(locatorator.update_marker_changes(previous, markers_edited, fuzzy_min_confidence=0.5), locatorator.build_marker_changes(markers_old, markers_edited, fuzzy_min_confidence=0.5))
+	assert_same_changes(locatorator.update_marker_changes(previous, markers_edited), locatorator.build_marker_changes(markers_old, markers_edited))
+
+	# A different shot ID pattern from last time
+	previous = locatorator.build_marker_changes(markers_old, markers_new)
+	monkeypatch.setitem(locatorator.ShotIdPatterns, "other", r"xx[0-9]+")
+	shot_id_pattern_other = locatorator.get_shot_id_pattern()
+	assert_same_changes(locatorator.update_marker_changes(previous, markers_edited, shot_id_pattern_other), locatorator.build_marker_changes(markers_old, markers_edited, shot_id_pattern_other))
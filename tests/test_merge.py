@@ -0,0 +1,40 @@
+import pytest
+import locatorator
+from locatorator import merge
+
+VFX_LIST = "Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed\nEditor\t01:00:05:00\tV1\tRed\tLF1001 note\t1\t\tRed\n"
+SOUND_LIST = "Sound\t01:00:00:00\tA1\tBlue\tRoom tone\t1\t\tBlue\nEditor\t01:00:05:00\tV1\tRed\tLF1001 note\t1\t\tRed\nSound\t01:00:07:00\tA1\tBlue\tLoop group\t1\t\tBlue\n"
+
+def merged(tmp_path, *texts, dedupe=False, require_shot_id=False):
+
+	paths = []
+	for idx, text in enumerate(texts):
+		paths.append(tmp_path / f"list{idx}.txt")
+		paths[-1].write_bytes(text if isinstance(text, bytes) else text.encode("utf-8"))
+	
+	return list(merge.merge_marker_lists([merge.iter_marker_list_from_path(path, require_shot_id=require_shot_id) for path in paths], dedupe))
+
+def test_merge_order(tmp_path):
+
+	markers = merged(tmp_path, VFX_LIST, SOUND_LIST)
+
+	# Timecode order, with markers at the same timecode in the order of their lists
+	assert [m.comment for m in markers] == ["LF1000 note", "Room tone", "LF1001 note", "LF1001 note", "Loop group"]
+
+def test_dedupe(tmp_path):
+
+	markers = merged(tmp_path, VFX_LIST, SOUND_LIST, dedupe=True)
+	assert [m.comment for m in markers] == ["LF1000 note", "Room tone", "LF1001 note", "Loop group"]
+
+def test_shot_ids_and_encodings(tmp_path):
+
+	markers = merged(tmp_path, locatorator.BOM_UTF8 + VFX_LIST.encode("utf-8"), SOUND_LIST.encode("utf-16"), require_shot_id=True)
+	assert [m.comment for m in markers] == ["LF1000 note", "LF1001 note", "LF1001 note"]
+
+def test_unsorted_input(tmp_path):
+
+	path = tmp_path / "unsorted.txt"
+	path.write_text("".join(reversed(VFX_LIST.splitlines(keepends=True))))
+
+	with pytest.raises(locatorator.MarkerListLoadError, match="line 2.*not sorted"):
+		list(merge.iter_marker_list_from_path(path))
@@ -0,0 +1,31 @@
+import locatorator
+from locatorator import reader
+
+LINES = [
+	"Editor\t01:00:00:00\tV1\tRed\tLF1000 café\t1\t\tRed".encode("utf-8"),
+	"Editor\t01:00:05:00\tV1\tRed\tLF1001 café\t1\tJosé\tRed".encode("cp1252"),
+	b"Editor\t01:00:10:00\tV1\tRed\tLF1002 odd \x81 byte\t1\t\tRed",
+]
+
+def fields(markers):
+	return [(m.start_frame, m.comment, m.user) for m in markers]
+
+def test_same_decoding_for_every_reader(tmp_path):
+
+	data = locatorator.BOM_UTF8 + b"\r\n".join(LINES) + b"\r\n"
+	path = tmp_path / "markers.txt"
+	path.write_bytes(data)
+
+	markers = locatorator.get_marker_list_from_bytes(data, legacy_encoding="cp1252")
+
+	assert fields(markers) == fields(reader.get_marker_list_from_mapped_file(path, legacy_encoding="cp1252"))
+	assert [m.comment for m in markers[:2]] == ["LF1000 café", "LF1001 café"]
+	assert markers[2].comment.startswith("LF1002 odd")
+	assert markers[1].user == "José"
+
+def test_utf16(tmp_path):
+
+	text = "\n".join(line.decode("utf-8") for line in LINES[:1])
+	markers = locatorator.get_marker_list_from_bytes(text.encode("utf-16"))
+
+	assert [m.comment for m in markers] == ["LF1000 café"]
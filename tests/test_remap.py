@@ -0,0 +1,55 @@
+import pytest
+import locatorator
+from locatorator import remap
+from locatorator.remap import TimecodeRemap
+
+REMAP = TimecodeRemap([(200, 48), (100, -24)])
+
+def test_offsets():
+
+	assert REMAP.breakpoints == [(100, -24), (200, 48)]
+
+	# Before the first shot moves with the first shot
+	assert REMAP.offset_at(0) == -24
+	assert REMAP.offset_at(100) == -24
+	assert REMAP.offset_at(199) == -24
+	assert REMAP.offset_at(200) == 48
+	assert REMAP.remap("00:00:10:00") == 240 + 48
+
+	assert TimecodeRemap([]).remap(50) == 50
+
+def test_remap_frames():
+
+	frames = [0, 99, 100, 150, 200, 1000]
+	expected = [-24, 75, 76, 126, 248, 1048]
+
+	assert REMAP.remap_frames(frames) == expected
+	assert REMAP.remap_frames(iter(frames)) == expected
+
+def test_remap_frames_numpy():
+
+	numpy = pytest.importorskip("numpy")
+
+	frames = numpy.array([0, 99, 100, 150, 200, 1000], dtype=numpy.int64)
+	remapped = REMAP.remap_frames(frames)
+
+	assert isinstance(remapped, numpy.ndarray)
+	assert remapped.tolist() == REMAP.remap_frames(frames.tolist())
+
+	empty = TimecodeRemap([]).remap_frames(frames)
+	assert empty.tolist() == frames.tolist() and empty is not frames
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_carry_over_markers(monkeypatch, use_numpy):
+
+	if use_numpy:
+		pytest.importorskip("numpy")
+	else:
+		monkeypatch.setattr(remap, "numpy", None)
+
+	markers_old = [locatorator.Marker(name="Editor", tc_start=frame, track="V1", color="red", comment=f"Note {frame}", duration=1, rate=30, drop_frame=True) for frame in (150, 10, 90)]
+	markers_new, clamped = remap.carry_over_markers(markers_old, REMAP)
+
+	assert [(m.start_frame, m.comment) for m in markers_new] == [(0, "Note 10"), (66, "Note 90"), (126, "Note 150")]
+	assert clamped == 1
+	assert all(m.rate == 30 and m.drop_frame for m in markers_new)
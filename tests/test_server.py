@@ -0,0 +1,91 @@
+import threading
+import pytest
+from locatorator import server
+
+OLD_LIST = "\n".join([
+	"Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed",
+	"Editor\t01:00:05:00\tV1\tRed\tLF1001 note\t1\t\tRed",
+	"Editor\t01:00:10:00\tV1\tRed\tLF1002 note\t1\t\tRed",
+])
+
+NEW_LIST = "\n".join([
+	"Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed",
+	"Editor\t01:00:06:00\tV1\tRed\tLF1001 note\t1\t\tRed",
+	"Editor\t01:00:11:00\tV1\tRed\tLF1102 note\t1\t\tRed",
+])
+
+@pytest.fixture
+def address():
+	"""A comparison server on a free local port"""
+
+	comparison_server = server.create_server(port=0)
+	thread = threading.Thread(target=comparison_server.serve_forever, daemon=True)
+	thread.start()
+
+	yield comparison_server.server_address[:2]
+
+	comparison_server.shutdown()
+	comparison_server.server_close()
+
+def test_compare(address):
+
+	host, port = address
+	changes = server.send_request("compare", {"old_text": OLD_LIST, "new_text": NEW_LIST}, host=host, port=port)["changes"]
+
+	assert [(c["change_type"], c["shot_id"]) for c in changes] == [
+		("UNCHANGED", "LF1000"),
+		("CHANGED",   "LF1001"),
+		("ADDED",     "LF1102"),
+		("DELETED",   "LF1002"),
+	]
+	assert changes[1]["offset"] == "00:00:01:00"
+	assert all(c["confidence"] == 1.0 for c in changes)
+
+def test_compare_fuzzy(address):
+
+	host, port = address
+	changes = server.send_request("compare", {"old_text": OLD_LIST, "new_text": NEW_LIST, "fuzzy": True}, host=host, port=port)["changes"]
+
+	renamed = changes[-1]
+	assert (renamed["change_type"], renamed["shot_id"], renamed["old_tc"], renamed["new_tc"]) == ("RENAMED", "LF1102", "01:00:10:00", "01:00:11:00")
+	assert 0 < renamed["confidence"] < 1
+
+def test_export(address):
+
+	host, port = address
+	marker_list = server.send_request("export", {"old_text": OLD_LIST, "new_text": NEW_LIST, "change_types": ["changed"]}, host=host, port=port)["marker_list"]
+
+	lines = marker_list.splitlines()
+	assert len(lines) == 1
+	assert lines[0].split("\t")[1] == "01:00:06:00"
+
+def test_status_counts_cache_hits(address):
+
+	host, port = address
+	for _ in range(2):
+		server.send_request("compare", {"old_text": OLD_LIST, "new_text": NEW_LIST}, host=host, port=port)
+
+	status = server.send_request("status", host=host, port=port)
+	assert status["cached_lists"] == 2
+	assert status["cache_hits"] == 2
+
+def test_bad_request(address):
+
+	host, port = address
+	with pytest.raises(ValueError, match="New marker list"):
+		server.send_request("compare", {"old_text": OLD_LIST}, host=host, port=port)
+
+def test_socket_path_is_never_a_regular_file(tmp_path):
+
+	path = tmp_path / "notes.txt"
+	path.write_text("Important")
+
+	with pytest.raises(ValueError, match="isn't a socket"):
+		server.create_server(socket_path=str(path))
+	assert path.read_text() == "Important"
+	
+	# A socket left behind is replaced
+	path_socket = tmp_path / "locatorator.sock"
+	stale = server.create_server(socket_path=str(path_socket))
+	stale.server_close()
+	server.create_server(socket_path=str(path_socket)).server_close()
@@ -0,0 +1,19 @@
+import pytest
+import locatorator
+
+def marker(comment:str) -> locatorator.Marker:
+	return locatorator.Marker(name="Editor", tc_start=86400, track="V1", color="red", comment=comment, duration=1)
+
+def test_pattern_with_named_groups():
+
+	locatorator.register_shot_id_pattern("test_groups", r"(?P<seq>AB)_(?P<num>\d{3})")
+	try:
+		assert locatorator.vfx_id_from_marker(marker("AB_123 fix this"), locatorator.get_shot_id_pattern()) == "AB_123"
+		assert locatorator.vfx_id_from_marker(marker("LF1000 note"), locatorator.get_shot_id_pattern()) == "LF1000"
+	finally:
+		del locatorator.ShotIdPatterns["test_groups"]
+
+def test_reserved_group_name():
+
+	with pytest.raises(ValueError, match="reserved"):
+		locatorator.register_shot_id_pattern("test_reserved", f"(?P<{locatorator.SHOT_ID_GROUP}>AB)")
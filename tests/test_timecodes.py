@@ -0,0 +1,108 @@
+import io
+import pytest
+from timecode import Timecode
+import locatorator
+from locatorator import timecodes
+
+SAMPLE_FRAMES = [0, 1, 23, 24, 1439, 1440, 86399, 86400, 86400 + 12345, 24 * 3600 * 23 + 5]
+
+def test_format_matches_timecode_library():
+
+	for frame_number in SAMPLE_FRAMES:
+		assert timecodes.format_timecode(frame_number) == str(Timecode(frame_number))
+
+def test_round_trip_through_timecode_library():
+
+	for frame_number in SAMPLE_FRAMES:
+		text = timecodes.format_timecode(frame_number)
+		assert timecodes.parse_timecode(text) == Timecode(text).frame_number == frame_number
+
+def test_drop_frame():
+
+	assert timecodes.format_timecode(1800, 30, drop_frame=True) == "00:01:00;02"
+	assert timecodes.format_timecode(17982, 30, drop_frame=True) == "00:10:00;00"
+
+	for frame_number in range(0, 30 * 60 * 12, 7):
+		assert timecodes.parse_timecode(timecodes.format_timecode(frame_number, 30, drop_frame=True), 30) == frame_number
+
+def test_nominal_rate():
+
+	class FakeTimecode:
+		rate = 23.976
+
+	assert timecodes.timecode_rate(FakeTimecode()) == 24
+
+def test_drop_frame_kept_on_export():
+
+	marker_list = "Editor\t01:00:00;00\tV1\tRed\tLF1000 note\t1\t\tRed\nEditor\t01:01:00;02\tV1\tRed\tLF1001 note\t1\t\tRed\nEditor\t01:01:00;29\tV1\tRed\tLF1002 note\t1\t\tRed\n"
+	markers = locatorator.get_marker_list_from_file(io.StringIO(marker_list))
+
+	assert [(m.rate, m.drop_frame) for m in markers] == [(30, True)] * 3
+	assert markers[1].start_frame - markers[0].start_frame == 1800
+	assert [str(m).split("\t")[1] for m in markers] == ["01:00:00;00", "01:01:00;02", "01:01:00;29"]
+
+	file_output = io.StringIO()
+	locatorator.write_change_list(locatorator.build_marker_changes([], markers), file_output)
+	assert [line.split("\t")[1] for line in file_output.getvalue().splitlines()] == ["01:00:00;00", "01:01:00;02", "01:01:00;29"]
+
+def test_rate_detected_from_the_list():
+
+	assert timecodes.detect_rate(["01:00:00:00", "01:00:00:23"]) == 24
+	assert timecodes.detect_rate(["01:00:00:00", "01:00:00:24"]) == 25
+	assert timecodes.detect_rate(["01:00:00:27"]) == 30
+	assert timecodes.detect_rate(["01:00:00;00"]) == 30
+	assert timecodes.detect_rate(["01:00:00:49"]) == 50
+
+	for text, rate in (("01:00:00:27", 30), ("01:00:00;29", 30), ("01:00:00:24", 25)):
+		markers = locatorator.get_marker_list_from_bytes(f"Editor\t{text}\tV1\tRed\tLF1000 note\t1\t\tRed\n".encode("utf-8"))
+		assert markers[0].rate == rate
+		assert str(markers[0]).split("\t")[1] == text
+
+	# A given rate is checked
+	with pytest.raises(locatorator.MarkerParseError):
+		locatorator.get_marker_list_from_bytes(b"Editor\t01:00:00:27\tV1\tRed\tLF1000 note\t1\t\tRed\n", rate=25)
+
+def test_lists_of_a_pair_share_a_rate(tmp_path):
+
+	# The old list never reaches frame 24, but the new one shows it's 25 fps
+	path_old, path_new = tmp_path / "old.txt", tmp_path / "new.txt"
+	path_old.write_text("Editor\t01:00:00:10\tV1\tRed\tLF1000 note\t1\t\tRed\n")
+	path_new.write_text("Editor\t01:00:00:24\tV1\tRed\tLF1000 note\t1\t\tRed\n")
+
+	markers_old, markers_new = locatorator.get_marker_lists_from_paths(path_old, path_new)
+	assert markers_old[0].rate == markers_new[0].rate == 25
+	assert markers_new[0].start_frame - markers_old[0].start_frame == 14
+
+def test_frame_counts_and_short_timecodes():
+
+	assert timecodes.parse_timecode("86400") == 86400
+	assert timecodes.parse_timecode("01:05") == 29
+	assert timecodes.parse_timecode("1:00:00") == 1440
+
+def test_out_of_range_fields():
+
+	for text in ("00:00:75:99", "00:60:00:00", "00:00:00:24", "00:01:00;00"):
+		with pytest.raises(ValueError):
+			timecodes.parse_timecode(text, 30 if ";" in text else 24)
+
+	with pytest.raises(locatorator.MarkerParseError, match="line 2"):
+		locatorator.get_marker_list_from_file(io.StringIO(
+			"Editor\t01:00:00:00\tV1\tRed\tLF1000 note\t1\t\tRed\n"
+			"Editor\t01:00:75:99\tV1\tRed\tLF1001 note\t1\t\tRed\n"
+		))
+
+def test_numpy_matches_python():
+
+	pytest.importorskip("numpy")
+
+	texts = [timecodes.format_timecode(frame_number) for frame_number in SAMPLE_FRAMES]
+	assert timecodes._parse_timecodes_numpy(texts, 24) == [timecodes.parse_timecode(text) for text in texts]
+
+	texts_df = [timecodes.format_timecode(frame_number, 30, drop_frame=True) for frame_number in range(0, 30 * 60 * 12, 7)]
+	assert timecodes._parse_timecodes_numpy(texts_df, 30) == [timecodes.parse_timecode(text, 30) for text in texts_df]
+
+	# Out of range fields go to the one-at-a-time parser to be reported
+	assert timecodes._parse_timecodes_numpy(["00:00:00:00", "00:00:75:99"], 24) is None
+	with pytest.raises(timecodes.TimecodeParseError) as error:
+		timecodes.parse_timecodes(["00:00:00:00", "00:00:75:99"])
+	assert error.value.index == 1
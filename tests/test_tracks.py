@@ -0,0 +1,21 @@
+import locatorator
+
+def marker(frame_text, track, vfx_id):
+	return locatorator.Marker.from_string(f"Editor\t{frame_text}\t{track}\tRed\t{vfx_id} note\t1\t\tRed")
+
+MARKERS_OLD = [marker("01:00:00:00", "V1", "LF1000"), marker("01:00:01:00", "V2", "LF2000"), marker("01:00:05:00", "V1", "LF1001")]
+MARKERS_NEW = [marker("01:00:00:00", "V1", "LF1000"), marker("01:00:02:00", "V2", "LF2000"), marker("01:00:05:00", "V1", "LF1001")]
+
+def rows(changes):
+	return [(change_type, marker_old and marker_old.comment, marker_new and marker_new.comment, offset) for change_type, marker_old, marker_new, offset in changes.rows()]
+
+def test_tracks_in_a_process_pool(monkeypatch):
+
+	serial, serial_tracks = locatorator.build_marker_changes_by_track(MARKERS_OLD, MARKERS_NEW)
+
+	monkeypatch.setattr(locatorator, "PARALLEL_TRACKS_THRESHOLD", 0)
+	parallel, parallel_tracks = locatorator.build_marker_changes_by_track(MARKERS_OLD, MARKERS_NEW)
+
+	assert rows(parallel) == rows(serial)
+	assert {track: rows(changes) for track, changes in parallel_tracks.items()} == {track: rows(changes) for track, changes in serial_tracks.items()}
+	assert [offset for *_, offset in rows(parallel_tracks["V2"])] == [24]
@@ -0,0 +1,26 @@
+import pytest
+import locatorator
+from locatorator import watch
+
+def test_old_list_is_compared_after_a_failed_refresh(tmp_path, old_list, new_list):
+
+	path_old, path_new, path_output = tmp_path / "old.txt", tmp_path / "new.txt", tmp_path / "changes.txt"
+	path_old.write_text(old_list)
+	path_new.write_text(new_list)
+
+	watcher = watch.ComparisonWatcher(path_old, path_new, path_output)
+	assert watcher.refresh()
+	assert watcher.markers_changes.summary.has_changes
+
+	# The old list catches up with the new one, but the new one is caught mid-export
+	path_old.write_text(new_list)
+	path_new.write_text("Editor\t01:00:0")
+	with pytest.raises(locatorator.MarkerListLoadError):
+		watcher.refresh({path_old.resolve(), path_new.resolve()})
+
+	path_new.write_text(new_list)
+	assert watcher.refresh({path_new.resolve()})
+	assert not watcher.markers_changes.summary.has_changes
+
+	# Nothing changed since
+	assert not watcher.refresh({path_old.resolve()})